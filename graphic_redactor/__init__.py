@@ -0,0 +1,5 @@
+"""Ядро графического редактора без Tk: документ, геометрия фигур и PIL-рендер."""
+from .document import Document
+from .geometry import (shape_bbox, simplify_points, fit_bezier, flatten_bezier, pen_stroke,
+                       spatial_index, index_query)
+from .render import PIL_AVAILABLE, draw_shape, render_region
@@ -0,0 +1,234 @@
+"""Бенчмарки на синтетических документах: время операций по размерам документа, результат — JSON.
+
+python -m graphic_redactor bench --sizes 100,1000,10000 --out bench.json [--compare old.json] [--gui "main v4.4.py"]
+"""
+import importlib.util
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from .document import Document
+from .export import export_document
+from .geometry import index_query, shape_bbox, spatial_index
+
+DEFAULT_SIZES = (100, 1000, 10000, 100000)
+MIX = {"pen": 0.4, "line": 0.2, "rect": 0.2, "oval": 0.2}
+COLORS = ("#222222", "#d50000", "#2962ff", "#00c853", "#ff6d00")
+
+
+def synthetic_document(shapes, points=32, mix=None, fills=1, seed=0, size=(1280, 720)):
+    """Документ из shapes фигур: штрихи пера по points точек (случайное блуждание), линии,
+    прямоугольники и эллипсы в пропорциях mix, затем fills растровых заливок фона."""
+    rnd = random.Random(seed)
+    W, H = size
+    doc = Document(W, H, "#ffffff")
+    kinds, weights = zip(*(mix or MIX).items())
+    for _ in range(shapes):
+        t = rnd.choices(kinds, weights)[0]
+        x, y = rnd.uniform(0, W), rnd.uniform(0, H)
+        stroke, width = rnd.choice(COLORS), rnd.choice((1, 2, 3, 5))
+        if t == "pen":
+            coords = [x, y]
+            for _ in range(points - 1):
+                x = min(W, max(0, x + rnd.uniform(-12, 12)))
+                y = min(H, max(0, y + rnd.uniform(-12, 12)))
+                coords += [round(x, 1), round(y, 1)]
+            fill = ""
+        elif t == "line":
+            coords = [x, y, x + rnd.uniform(-200, 200), y + rnd.uniform(-200, 200)]
+            fill = ""
+        else:
+            coords = [x, y, x + rnd.uniform(5, 160), y + rnd.uniform(5, 120)]
+            fill = rnd.choice(("",) + COLORS)
+        doc.shapes.append({"type": t, "coords": coords, "stroke": stroke, "width": width, "fill": fill})
+    for _ in range(fills):
+        doc.fill_raster(rnd.randrange(W), rnd.randrange(H), rnd.choice(COLORS))
+    return doc
+
+
+def _timed(fn, repeat):
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return runs
+
+
+def bench_size(n, repeat=3, points=32, gui=None):
+    """Замеры для одного размера; возвращает список {op, shapes, best_s, runs}."""
+    t0 = time.perf_counter()
+    doc = synthetic_document(n, points)
+    results = [{"op": "generate", "runs": [time.perf_counter() - t0]}]
+    rnd = random.Random(1)
+    tmp = tempfile.mkdtemp(prefix="gr-bench-")
+    try:
+        results += _bench_ops(doc, n, rnd, tmp, repeat)
+        if gui:
+            results += bench_gui(gui, doc, repeat)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    for r in results:
+        r["shapes"] = n
+        r["best_s"] = min(r["runs"]) if r["runs"] else None
+    return results
+
+
+def _bench_ops(doc, n, rnd, tmp, repeat):
+    results = []
+    path = os.path.join(tmp, "doc.json")
+
+    def undo_redo():
+        k = max(1, n // 10)
+        for _ in range(k):
+            doc.undo()
+        for _ in range(k):
+            doc.redo()
+
+    grid = spatial_index(doc.shapes, 64)
+    probes = [(rnd.randrange(doc.canvas_w), rnd.randrange(doc.canvas_h)) for _ in range(100)]
+    # попадание щелчка — настоящий Document.fill_seed; он заливает найденный rect / oval,
+    # поэтому на копии фигур, чтобы остальные замеры шли по исходному документу
+    probe_doc = Document(doc.canvas_w, doc.canvas_h, doc.background)
+    probe_doc.shapes = [dict(s) for s in doc.shapes]
+
+    def hit_test():
+        for x, y in probes:
+            probe_doc.fill_seed(x, y, "#abcdef")
+
+    def fill(sx, sy):
+        d = Document(doc.canvas_w, doc.canvas_h, doc.background)
+        d.shapes = doc.shapes
+        return d.fill_raster(sx, sy, "#abcdef")
+
+    ops = [
+        ("save", lambda: doc.save(path)),
+        ("load", lambda: Document.open(path)),
+        ("spatial_index", lambda: spatial_index(doc.shapes, 64)),
+        ("hit_test_100", hit_test),
+        ("undo_redo_10pct", undo_redo),
+        ("render", doc.render),
+        ("export_png", lambda: export_document(doc, os.path.join(tmp, "out.png"), jobs=1)),
+    ]
+    for name, fn in ops:
+        results.append({"op": name, "runs": _timed(fn, repeat)})
+    # время заливки определяется площадью области, а не числом фигур — поэтому несколько
+    # фиксированных затравок, каждая отдельной строкой и с размером залитой области
+    for label, (sx, sy) in fill_seeds(doc, grid, 64).items():
+        res = fill(sx, sy)
+        area = sum(res[0].crop(res[1]).histogram()[1:]) if res else 0
+        results.append({"op": f"bucket_fill_{label}", "runs": _timed(lambda: fill(sx, sy), repeat),
+                        "seed": [sx, sy], "filled_px": area})
+    return results
+
+
+def fill_seeds(doc, grid, cell, randoms=2):
+    """Затравки заливки: точка фона вне габаритов всех фигур (если такая есть), центр самого крупного прямоугольника /
+    эллипса и randoms случайных точек (фиксированный seed — одни и те же от прогона к прогону)."""
+    W, H = int(doc.canvas_w), int(doc.canvas_h)
+    seeds = {}
+    for y in range(8, H, 16):
+        for x in range(8, W, 16):
+            near = index_query(grid, cell, (x, y, x + 1, y + 1))
+            if not any(_inside(shape_bbox(doc.shapes[i]), x, y) for i in near):
+                seeds["background"] = (x, y)
+                break
+        if seeds:
+            break
+    # центр должен быть на холсте, иначе заливать нечего
+    closed = [c for c in (tuple(map(int, s["coords"])) for s in doc.shapes if s["type"] in ("rect", "oval"))
+              if 0 <= (c[0] + c[2]) // 2 < W and 0 <= (c[1] + c[3]) // 2 < H]
+    if closed:
+        x0, y0, x1, y1 = max(closed, key=lambda c: abs(c[2] - c[0]) * abs(c[3] - c[1]))
+        seeds["in_shape"] = ((x0 + x1) // 2, (y0 + y1) // 2)
+    rnd = random.Random(2)
+    for k in range(randoms):
+        seeds[f"random{k + 1}"] = (rnd.randrange(W), rnd.randrange(H))
+    return seeds
+
+
+def _inside(b, x, y):
+    return b[0] <= x < b[2] and b[1] <= y < b[3]
+
+
+def load_editor_module(script, name=None):
+    """Импортирует скрипт редактора ("main vX.py") по пути, без запуска mainloop."""
+    name = name or "editor_" + "".join(c if c.isalnum() else "_" for c in os.path.basename(script))
+    spec = importlib.util.spec_from_file_location(name, script)
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def bench_gui(script, doc, repeat):
+    """redraw_all настоящего Editor на документе; нужен дисплей (X / xvfb-run), иначе пропуск."""
+    import tkinter as tk
+    try:
+        mod = load_editor_module(script)
+        app = mod.App()
+    except tk.TclError as e:
+        return [{"op": "gui_redraw", "runs": [], "skipped": str(e)}]
+    try:
+        ed = app.get_frame("Editor") if hasattr(app, "get_frame") else app.frames["Editor"]
+        if hasattr(ed, "doc"):
+            ed.doc.load_dict(doc.to_dict())
+        else:
+            ed.shapes = [dict(s) for s in doc.shapes]  # версии до Document
+
+        def redraw():
+            ed.redraw_all()
+            app.update_idletasks()
+        return [{"op": "gui_redraw", "runs": _timed(redraw, repeat)}]
+    finally:
+        app.destroy()
+
+
+def environment():
+    try:
+        from PIL import __version__ as pil_version
+    except ImportError:
+        pil_version = None
+    return {"python": platform.python_version(), "platform": platform.platform(),
+            "machine": platform.machine(), "cpus": os.cpu_count(), "pillow": pil_version,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def run(sizes=DEFAULT_SIZES, repeat=3, points=32, gui=None, log=print):
+    results = []
+    for n in sizes:
+        for r in bench_size(n, repeat, points, gui):
+            results.append(r)
+            if log:
+                best = f"{r['best_s'] * 1000:10.2f} ms" if r["best_s"] is not None else "   skipped"
+                area = f"  {r['filled_px']} px" if "filled_px" in r else ""
+                log(f"{n:>7} {r['op']:<24} {best}{area}")
+    return {"env": environment(), "params": {"repeat": repeat, "points": points}, "results": results}
+
+
+def compare(old, new, threshold=0.2):
+    """Строки сравнения с прошлым прогоном и число регрессий (медленнее более чем на threshold)."""
+    before = {(r["shapes"], r["op"]): r["best_s"] for r in old["results"] if r.get("best_s")}
+    lines, regressions = [], 0
+    for r in new["results"]:
+        prev = before.get((r["shapes"], r["op"]))
+        if not prev or not r.get("best_s"):
+            continue
+        ratio = r["best_s"] / prev
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        lines.append(f"{r['shapes']:>7} {r['op']:<24} {prev * 1000:10.2f} -> {r['best_s'] * 1000:10.2f} ms"
+                     f"  x{ratio:.2f}{flag}")
+    return lines, regressions
+
+
+def save(report, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
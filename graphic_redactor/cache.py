@@ -0,0 +1,116 @@
+"""Дисковый кэш экспорта: ключ — хэш содержимого документа и параметров экспорта, вытеснение LRU по размеру.
+
+Повторный экспорт неизменённого проекта просто копирует готовый файл из кэша.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from .export import export_document, format_for
+
+CACHE_VERSION = 1  # менять при изменении рендера, чтобы старые файлы не выдавались
+CACHE_ROOT = os.environ.get("GRAPHIC_REDACTOR_CACHE") or os.path.join(
+    os.path.expanduser("~"), ".cache", "graphic_redactor")
+DEFAULT_DIR = os.path.join(CACHE_ROOT, "export")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def document_hash(doc, **options):
+    """SHA-256 по meta, фигурам, пикселям растрового слоя и параметрам экспорта."""
+    h = hashlib.sha256()
+
+    def feed(obj):
+        h.update(json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+        h.update(b"\n")
+
+    feed({"v": CACHE_VERSION, "options": options})
+    feed({"w": int(doc.canvas_w), "h": int(doc.canvas_h), "bg": doc.background})
+    for s in doc.shapes:
+        feed(s)
+    if doc.raster_img is not None:
+        W, H = doc.raster_img.size
+        feed({"raster": [W, H]})
+        for y in range(0, H, 256):  # полосами, без копии всего слоя
+            h.update(doc.raster_img.crop((0, y, W, min(y + 256, H))).tobytes())
+    return h.hexdigest()
+
+
+class ExportCache:
+    """Каталог файлов <хэш>.<расширение>; mtime — время последнего использования."""
+
+    def __init__(self, root=DEFAULT_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def _path(self, key, ext):
+        return os.path.join(self.root, f"{key}.{ext}")
+
+    def get(self, key, ext):
+        p = self._path(key, ext)
+        try:
+            os.utime(p)
+        except OSError:
+            return None
+        return p
+
+    def put(self, key, ext, src):
+        """Копирует готовый файл в кэш (атомарно — параллельные воркеры CLI не видят недописанного)."""
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        os.close(fd)
+        try:
+            shutil.copyfile(src, tmp)
+            os.replace(tmp, self._path(key, ext))
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Удаляет самые давно использованные файлы, пока кэш больше max_bytes."""
+        entries, total = [], 0
+        for name in os.listdir(self.root):
+            if name.endswith(".tmp"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.root, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+            total += st.st_size
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.root, name))
+            except OSError:
+                continue  # уже удалил другой процесс
+            total -= size
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def cached_export(doc, path, fmt=None, cache=None, aa=1, aa_filter="lanczos", **kwargs):
+    """export_document через кэш; возвращает (path, взят_ли_из_кэша).
+    band/jobs на пиксели не влияют и в ключ не входят."""
+    fmt = format_for(path, fmt)
+    cache = cache or ExportCache()
+    ext = fmt.lower()
+    key = document_hash(doc, fmt=fmt, aa=aa, aa_filter=aa_filter if aa != 1 else None)
+    hit = cache.get(key, ext)
+    if hit:
+        try:
+            shutil.copyfile(hit, path)
+            return path, True
+        except FileNotFoundError:
+            pass  # между get и копированием файл вытеснил другой процесс — экспортируем заново
+    export_document(doc, path, fmt, aa=aa, aa_filter=aa_filter, **kwargs)
+    try:
+        cache.put(key, ext, path)
+    except OSError:
+        pass  # кэш — только ускорение, экспорт уже готов
+    return path, False
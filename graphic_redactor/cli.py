@@ -0,0 +1,280 @@
+"""Командная строка без GUI:
+python -m graphic_redactor export *.json --out dir --format png
+python -m graphic_redactor bench --sizes 100,1000 --out bench.json
+xvfb-run -a python -m graphic_redactor replay macro.json --script "main v4.4.py" [--speed 1]
+xvfb-run -a python -m graphic_redactor versions "main v*.py" --strokes 200 --out versions.json
+python -m graphic_redactor memory project.json [--trace]
+python -m graphic_redactor telemetry [логи или каталоги] [--by-size] [--on | --off]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from .cache import DEFAULT_DIR, ExportCache, cached_export
+from .document import Document
+from .export import FORMATS, export_document, export_tiles
+
+
+def export_file(path, out_dir, fmt, band=None, tiles=None, jobs=1, aa=1, aa_filter="lanczos", cache_dir=None):
+    """Экспорт одного проекта (выполняется в процессе-воркере). Возвращает отчёт со временами этапов.
+    band — потоковый PNG полосами, tiles — набор PNG-тайлов в out_dir/<имя>/,
+    jobs — процессов для полос одного файла, aa/aa_filter — сглаживание суперсэмплингом,
+    cache_dir — кэш экспорта (None — всегда рендерить)."""
+    report = {"src": path, "out": None, "error": None, "cached": False}
+    t0 = time.perf_counter()
+    try:
+        doc = Document.open(path)
+        t1 = time.perf_counter()
+        stem = os.path.splitext(os.path.basename(path))[0]
+        if tiles:
+            out = os.path.join(out_dir, stem)
+            export_tiles(doc, out, tiles, stem, aa, aa_filter)
+        elif cache_dir:
+            out = os.path.join(out_dir, stem + "." + fmt)
+            _, report["cached"] = cached_export(doc, out, fmt, ExportCache(cache_dir), aa, aa_filter,
+                                                band=band, jobs=jobs)
+        else:
+            out = os.path.join(out_dir, stem + "." + fmt)
+            export_document(doc, out, fmt, band, jobs, aa, aa_filter)
+        t2 = time.perf_counter()
+        report.update(out=out, shapes=len(doc.shapes), load_s=t1 - t0, export_s=t2 - t1)
+    except Exception as e:
+        report["error"] = f"{type(e).__name__}: {e}"
+    report["total_s"] = time.perf_counter() - t0
+    return report
+
+
+def expand_inputs(patterns):
+    """Раскрывает маски сами (cmd.exe на Windows их не раскрывает), сохраняя порядок и без дублей."""
+    seen, files = set(), []
+    for p in patterns:
+        for f in (sorted(glob.glob(p)) if glob.has_magic(p) else [p]):
+            if f not in seen:
+                seen.add(f)
+                files.append(f)
+    return files
+
+
+def cmd_export(args):
+    files = expand_inputs(args.inputs)
+    if not files:
+        print("Файлдар табылмады", file=sys.stderr)
+        return 2
+    os.makedirs(args.out, exist_ok=True)
+    jobs = args.jobs or os.cpu_count() or 1
+    t0 = time.perf_counter()
+    work = partial(export_file, out_dir=args.out, fmt=args.format, band=args.band, tiles=args.tiles,
+                   jobs=(args.jobs or None) if len(files) == 1 else 1, aa=args.aa, aa_filter=args.aa_filter,
+                   cache_dir=None if args.no_cache else args.cache_dir)
+    if jobs == 1 or len(files) == 1:
+        # один файл — ядра уходят на его полосы
+        failed = _print_reports(map(work, files))
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(files))) as pool:
+            failed = _print_reports(pool.map(work, files))
+    wall = time.perf_counter() - t0
+    print(f"Барлығы: {len(files)} файл, қате: {failed}, {wall:.2f} s ({jobs} процесс)")
+    return 1 if failed else 0
+
+
+def _print_reports(reports):
+    failed = 0
+    for r in reports:
+        if r["error"]:
+            failed += 1
+            print(f"ҚАТЕ {r['src']}: {r['error']}", file=sys.stderr)
+        else:
+            print(f"OK   {r['src']} -> {r['out']}  {r['shapes']} фигура, "
+                  f"жүктеу {r['load_s'] * 1000:.0f} ms, экспорт {r['export_s'] * 1000:.0f} ms"
+                  + ("  (кэштен)" if r["cached"] else ""))
+    return failed
+
+
+def cmd_bench(args):
+    from . import bench
+    sizes = [int(v) for v in args.sizes.split(",") if v.strip()]
+    report = bench.run(sizes, args.repeat, args.points, args.gui)
+    if args.out:
+        bench.save(report, args.out)
+        print(f"Нәтиже: {args.out}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            lines, regressions = bench.compare(json.load(f), report, args.threshold)
+        print("\n".join(lines))
+        if regressions:
+            print(f"Баяулау: {regressions}", file=sys.stderr)
+            return 1
+    return 0
+
+
+def cmd_replay(args):
+    import tkinter as tk
+    from .bench import load_editor_module
+    from .macro import load_macro, replay
+    macro = load_macro(args.macro)
+    try:
+        app = load_editor_module(args.script).App()
+    except tk.TclError as e:
+        print(f"Дисплей жоқ ({e}); xvfb-run арқылы іске қосыңыз", file=sys.stderr)
+        return 2
+    try:
+        ed = app.get_frame("Editor") if hasattr(app, "get_frame") else app.frames["Editor"]
+        app.show_frame("Editor")
+        meta = macro.get("meta", {})
+        if args.project:
+            ed.load_project(args.project)
+        elif "w" in meta and hasattr(ed, "canvas_w"):
+            ed.canvas_w, ed.canvas_h = meta["w"], meta["h"]
+            if hasattr(ed, "apply_scrollregion"):
+                ed.apply_scrollregion()
+            ed.redraw_all()
+        app.update()
+        runs = [replay(ed, macro, args.speed, app.update) for _ in range(args.repeat)]
+    finally:
+        app.destroy()
+    for i, r in enumerate(runs, 1):
+        h = r["handler_ms"]
+        print(f"#{i}: {r['events']} оқиға, {r['wall_s']:.2f} s, drag p95 {h['drag'].get('p95', 0):.2f} ms, "
+              f"release p95 {h['release'].get('p95', 0):.2f} ms")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"macro": args.macro, "script": args.script, "runs": runs}, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+def cmd_versions(args):
+    from .versions import compare_versions, find_scripts, table
+    scripts = find_scripts(args.scripts)
+    if not scripts:
+        print("Редактор скрипттері табылмады", file=sys.stderr)
+        return 2
+    report = compare_versions(scripts, args.timeout, strokes=args.strokes, points=args.points,
+                              fills=args.fills, seed=args.seed)
+    print("\n".join(table(report["reports"])))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0 if any(not r.get("skipped") and not r.get("error") for r in report["reports"]) else 1
+
+
+def cmd_memory(args):
+    """Разбивка памяти документа после загрузки (и рендера); --trace — рост по tracemalloc."""
+    from .memory import TraceSnapshots, breakdown, format_breakdown
+    snaps = TraceSnapshots()
+    code = 0
+    for path in expand_inputs(args.inputs):
+        if args.trace:
+            snaps.take("start")
+        try:
+            doc = Document.open(path)
+            if args.render:
+                doc.render()
+        except Exception as e:
+            print(f"{path}: {type(e).__name__}: {e}", file=sys.stderr)
+            code = 1
+            continue
+        print(f"{path}: {len(doc.shapes)} фигура")
+        for line in format_breakdown(breakdown(doc)):
+            print("  " + line)
+        if args.trace:
+            snaps.take("loaded")
+            for line in snaps.diff(limit=args.top):
+                print("  " + line)
+            snaps.stop()
+    return code
+
+
+def cmd_telemetry(args):
+    from .telemetry import TELEMETRY, aggregate, log_files, read_events, report_lines
+    if args.on or args.off:
+        TELEMETRY.set_enabled(bool(args.on))
+        print(f"Телеметрия {'қосылды' if args.on else 'өшірілді'}: {TELEMETRY.root}")
+        return 0
+    files = [f for f in log_files(args.inputs) if os.path.isfile(f)]
+    if not files:
+        print("Телеметрия логтары табылмады", file=sys.stderr)
+        return 2
+    agg = aggregate(read_events(files), args.by_size)
+    print("\n".join(report_lines(agg)))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump([dict(op=k[0], size=k[1] if len(k) > 1 else None, **v) for k, v in agg.items()],
+                      f, ensure_ascii=False, indent=2)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m graphic_redactor",
+                                     description="Қарапайым графиктік редактор — GUI-сыз құралдар")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("export", help="JSON жобаларды суретке экспорттау")
+    p.add_argument("inputs", nargs="+", help="жоба файлдары немесе маскалар (*.json)")
+    p.add_argument("--out", default=".", help="шығыс каталогы")
+    p.add_argument("--format", default="png", choices=sorted(FORMATS), help="сурет форматы")
+    p.add_argument("--band", type=int, default=None, metavar="PX",
+                   help="PNG-ны осы биіктіктегі жолақтармен ағынды жазу (үлкен кенептер үшін)")
+    p.add_argument("--tiles", type=int, default=None, metavar="PX",
+                   help="бір сурет орнына PNG тайлдар жиынын жазу")
+    p.add_argument("--aa", type=int, default=1, choices=(1, 2, 3, 4),
+                   help="тегістеу: N есе үлкен салып, кішірейту")
+    p.add_argument("--aa-filter", default="lanczos", choices=("box", "lanczos"), help="кішірейту сүзгісі")
+    p.add_argument("--cache-dir", default=DEFAULT_DIR, help="экспорт кэшінің каталогы")
+    p.add_argument("--no-cache", action="store_true", help="кэшті қолданбау")
+    p.add_argument("-j", "--jobs", type=int, default=0, help="процестер саны (әдепкі — CPU саны)")
+    p.set_defaults(func=cmd_export)
+
+    b = sub.add_parser("bench", help="синтетикалық құжаттардағы бенчмарк (JSON)")
+    b.add_argument("--sizes", default="100,1000,10000,100000", help="фигуралар саны, үтір арқылы")
+    b.add_argument("--repeat", type=int, default=3, help="әр өлшеудің қайталануы (ең жақсысы алынады)")
+    b.add_argument("--points", type=int, default=32, help="қалам штрихындағы нүктелер саны")
+    b.add_argument("--gui", metavar="SCRIPT", help="redraw_all үшін редактор скрипті (дисплей керек)")
+    b.add_argument("--out", help="нәтиже JSON файлы")
+    b.add_argument("--compare", metavar="JSON", help="алдыңғы нәтижемен салыстыру")
+    b.add_argument("--threshold", type=float, default=0.2, help="баяулау шегі (0.2 = 20%%)")
+    b.set_defaults(func=cmd_bench)
+
+    r = sub.add_parser("replay", help="макросты редакторда қайта ойнату (дисплей немесе xvfb-run керек)")
+    r.add_argument("macro", help="жазылған макрос (JSON)")
+    r.add_argument("--script", default="main v4.4.py", help="редактор скрипті")
+    r.add_argument("--speed", type=float, default=None, help="жылдамдық көбейткіші (әдепкі — максимал)")
+    r.add_argument("--project", help="алдымен осы жобаны ашу")
+    r.add_argument("--repeat", type=int, default=1)
+    r.add_argument("--out", help="нәтиже JSON файлы")
+    r.set_defaults(func=cmd_replay)
+
+    v = sub.add_parser("versions", help="редактор нұсқаларын бір жүктемеде салыстыру (дисплей немесе xvfb-run керек)")
+    v.add_argument("scripts", nargs="*", help='редактор скрипттері (әдепкі: "main v*.py")')
+    v.add_argument("--strokes", type=int, default=200, help="фигуралар саны")
+    v.add_argument("--points", type=int, default=24, help="бір фигурадағы қозғалыс оқиғалары")
+    v.add_argument("--fills", type=int, default=5, help="құю шертулері")
+    v.add_argument("--seed", type=int, default=0)
+    v.add_argument("--timeout", type=float, default=600, help="бір нұсқаға секунд шегі")
+    v.add_argument("--out", help="нәтиже JSON файлы")
+    v.set_defaults(func=cmd_versions)
+
+    m = sub.add_parser("memory", help="жобаның жад есебі (шамамен, байт бойынша)")
+    m.add_argument("inputs", nargs="+", help="JSON жобалар (маскалар рұқсат)")
+    m.add_argument("--render", action="store_true", help="жүктегеннен кейін кенепті рендерлеу")
+    m.add_argument("--trace", action="store_true", help="tracemalloc: жүктеу кезіндегі өсім")
+    m.add_argument("--top", type=int, default=10, help="tracemalloc жолдарының саны")
+    m.set_defaults(func=cmd_memory)
+
+    t = sub.add_parser("telemetry", help="жергілікті телеметрия логтарын жинақтау (перцентильдер)")
+    t.add_argument("inputs", nargs="*", help="JSONL логтар немесе каталогтар (әдепкі — осы машинаның логы)")
+    t.add_argument("--by-size", action="store_true", help="фигуралар саны бойынша бөлу")
+    t.add_argument("--out", help="нәтиже JSON файлы")
+    onoff = t.add_mutually_exclusive_group()
+    onoff.add_argument("--on", action="store_true", help="осы машинада телеметрияны қосу")
+    onoff.add_argument("--off", action="store_true", help="өшіру")
+    t.set_defaults(func=cmd_telemetry)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
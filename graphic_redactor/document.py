@@ -0,0 +1,300 @@
+"""Документ редактора без Tk: холст, фигуры, растровый слой заливки, история, JSON и PIL-рендер.
+
+Editor — только Tk-представление над Document; CLI, воркеры и бенчмарки работают с ним напрямую.
+"""
+import base64
+import io
+import json
+import sys
+import time
+
+from .geometry import flatten_bezier, pen_stroke
+from .profiling import traced
+from .render import PIL_AVAILABLE, draw_shape, render_region
+
+
+class Document:
+    RASTER_TILE = 256  # растровый слой сохраняется в JSON PNG-тайлами, пустые пропускаются
+
+    def __init__(self, canvas_w=1280, canvas_h=720, background="#ffffff"):
+        self.canvas_w = canvas_w
+        self.canvas_h = canvas_h
+        self.background = background
+        self.shapes = []         # [{type, coords, stroke, width, fill}]
+        self.raster_img = None   # PIL.Image RGBA в логическом размере (bucket-fill под фигурами)
+        self._undo_stack = []    # отменённые фигуры — для redo
+        self.revision = 0        # растёт при каждом изменении набора / геометрии фигур
+        self.generation = 0      # растёт при reset / load_dict: это уже другой документ
+        self.last_fill_ms = {}   # этапы последней растровой заливки: scene, mask, composite
+
+    # ---------- Состояние ----------
+    def reset(self, canvas_w=None, canvas_h=None, background=None):
+        """Пустой документ; размеры и фон — новые или текущие."""
+        if canvas_w is not None:
+            self.canvas_w = int(canvas_w)
+        if canvas_h is not None:
+            self.canvas_h = int(canvas_h)
+        if background is not None:
+            self.background = background
+        self.shapes = []
+        self.raster_img = None
+        self._undo_stack.clear()
+        self.revision += 1
+        self.generation += 1
+
+    def has_content(self) -> bool:
+        return len(self.shapes) > 0 or self.raster_img is not None
+
+    # ---------- Фигуры ----------
+    def add_shape(self, shape):
+        """Добавляет фигуру, сбрасывает redo; возвращает её индекс."""
+        self.shapes.append(shape)
+        self._undo_stack.clear()
+        self.revision += 1
+        return len(self.shapes) - 1
+
+    def move_shape(self, idx, dx, dy):
+        s = self.shapes[idx]
+        s["coords"] = [v + (dx if i % 2 == 0 else dy) for i, v in enumerate(s["coords"])]
+        self.revision += 1
+
+    def undo(self):
+        """Убирает последнюю фигуру; возвращает её бывший индекс или None."""
+        if not self.shapes:
+            return None
+        self._undo_stack.append(self.shapes.pop())
+        self.revision += 1
+        return len(self.shapes)
+
+    def redo(self):
+        """Возвращает последнюю отменённую фигуру; её индекс или None."""
+        if not self._undo_stack:
+            return None
+        self.shapes.append(self._undo_stack.pop())
+        self.revision += 1
+        return len(self.shapes) - 1
+
+    def optimize(self, tolerance, curve_fit=False):
+        """Упрощает штрихи пера (RDP / Безье); возвращает (точек до, точек после).
+        В s["tol"] — накопленная граница отклонения штриха от нарисованного; штрихи, у которых
+        она уже не меньше tolerance, пропускаются, чтобы повторные проходы не копили ошибку."""
+        before = after = 0
+        for s in self.shapes:
+            if s["type"] != "pen" or s.get("tol", 0) >= tolerance:
+                continue
+            before += len(s["coords"]) // 2
+            s["type"], s["coords"] = pen_stroke(s["coords"], tolerance, curve_fit)
+            s["tol"] = s.get("tol", 0) + tolerance
+            after += len(s["coords"]) // 2
+        if after != before:
+            self.revision += 1
+        return before, after
+
+    @property
+    def redo_count(self):
+        return len(self._undo_stack)
+
+    def memory_estimate(self):
+        """Примерный объём истории в байтах: фигуры, redo-стек и растровый слой. O(число фигур)."""
+        size = 0
+        for s in self.shapes + self._undo_stack:
+            size += sys.getsizeof(s) + sys.getsizeof(s["coords"]) + 24 * len(s["coords"])
+        if self.raster_img is not None:
+            size += self.raster_img.width * self.raster_img.height * 4
+        return size
+
+    # ---------- Bucket fill (Құю) ----------
+    def fill(self, x, y, color, trace=None):
+        """Заливка в точке (x, y): внутренность rect/oval или область до границы на растровом слое.
+        Возвращает ("shape", idx), ("stroke" | "background", mask, box) или None.
+        trace(event, *args) — для отладки."""
+        res = self.fill_seed(x, y, color, trace)
+        if res is None or res[0] == "shape":
+            return res
+        kind, sx, sy = res
+        res = self.fill_raster(sx, sy, color)
+        return (kind,) + res if res else None
+
+    def fill_seed(self, x, y, color, trace=None):
+        """Первая часть fill: фигура под точкой заливается сразу — ("shape", idx);
+        для растровой заливки возвращается затравка ("stroke" | "background", sx, sy) — маску
+        можно считать отдельно (fill_mask, в том числе в воркере) и наложить apply_fill."""
+        trace = trace or (lambda *a: None)
+        for idx, s in enumerate(self.shapes):
+            t = s["type"]
+            coords = s["coords"]
+
+            if t in ("rect", "oval"):
+                x0, y0, x1, y1 = map(int, coords)
+                if x0 <= x <= x1 and y0 <= y <= y1:
+                    s["fill"] = color or "#ffffff"
+                    trace("fill figure", t, idx)
+                    return "shape", idx
+
+            if t in ("line", "pen", "bezier"):
+                if t == "bezier":
+                    pts = flatten_bezier(coords)
+                else:
+                    pts = [(coords[i], coords[i + 1]) for i in range(0, len(coords) - 1, 2)]
+                if len(pts) < 2:
+                    continue
+                best = None
+                for (x1, y1), (x2, y2) in zip(pts, pts[1:]):
+                    dx, dy = x2 - x1, y2 - y1
+                    seglen2 = dx * dx + dy * dy
+                    if seglen2 == 0:
+                        continue
+                    tproj = max(0, min(1, ((x - x1) * dx + (y - y1) * dy) / seglen2))
+                    projx = x1 + dx * tproj
+                    projy = y1 + dy * tproj
+                    dist2 = (projx - x) ** 2 + (projy - y) ** 2
+                    if best is None or dist2 < best[0]:
+                        best = (dist2, dx, dy, projx, projy)
+
+                if best:
+                    dist2, dx, dy, projx, projy = best
+                    # если курсор слишком далеко (>6 пикселей) — пропускаем
+                    if dist2 > 36:
+                        continue
+                    seglen = (dx ** 2 + dy ** 2) ** 0.5
+                    nx, ny = -dy / seglen, dx / seglen
+                    sx, sy = int(projx + nx * 4), int(projy + ny * 4)
+                    trace("proj", projx, projy)
+                    trace("+seed", sx, sy)
+                    trace("-seed", int(projx - nx * 4), int(projy - ny * 4))
+                    return "stroke", sx, sy
+
+        trace("bg fill", x, y)
+        return "background", x, y
+
+    @traced("Document.fill_raster")
+    def fill_raster(self, sx, sy, color):
+        """Заливает растровый слой с seed (sx, sy) до контуров фигур; возвращает (mask, box) или None."""
+        res = self.fill_mask(sx, sy, color)
+        if res is None:
+            return None
+        self.apply_fill(*res, color)
+        return res
+
+    def fill_mask(self, sx, sy, color):
+        """Маска заливки с seed (sx, sy) по сцене контуров, без изменения документа: (mask, box) или None.
+        Заполняет last_fill_ms["scene"], ["mask"]."""
+        from PIL import Image, ImageColor
+        W, H = max(2, int(self.canvas_w)), max(2, int(self.canvas_h))
+        t0 = time.perf_counter()
+        scene = self.render_outlines()
+        t1 = time.perf_counter()
+        self.last_fill_ms = {"scene": (t1 - t0) * 1000}
+        fill_rgb = ImageColor.getrgb(color)
+        target = scene.getpixel((max(0, min(W - 1, sx)), max(0, min(H - 1, sy))))
+        if target == fill_rgb:
+            return None
+
+        mask = Image.new("1", (W, H), 0)
+        spx = scene.load()
+        mpx = mask.load()
+        stack = [(sx, sy)]
+        while stack:
+            px, py = stack.pop()
+            if px < 0 or py < 0 or px >= W or py >= H:
+                continue
+            if mpx[px, py] or spx[px, py] != target:
+                continue
+            mpx[px, py] = 1
+            stack.extend([(px + 1, py), (px - 1, py), (px, py + 1), (px, py - 1)])
+
+        box = mask.getbbox()
+        self.last_fill_ms["mask"] = (time.perf_counter() - t1) * 1000
+        if box is None:
+            return None
+        return mask, box
+
+    def apply_fill(self, mask, box, color):
+        """Накладывает готовую маску на растровый слой цветом color."""
+        from PIL import Image, ImageColor
+        t0 = time.perf_counter()
+        W, H = mask.size
+        if self.raster_img is None or self.raster_img.size != (W, H):
+            self.raster_img = Image.new("RGBA", (W, H), (0, 0, 0, 0))
+        self.raster_img.paste(ImageColor.getrgb(color)[:3] + (255,), box, mask.crop(box))
+        self.last_fill_ms["composite"] = (time.perf_counter() - t0) * 1000
+
+    # ---------- Рендер ----------
+    def render(self, box=None, scale=1, resample="lanczos"):
+        """Итоговое RGB-изображение документа (или области box) — то же, что экспорт.
+        scale > 1 — со сглаживанием суперсэмплингом."""
+        return render_region(self.shapes, box or (0, 0, int(self.canvas_w), int(self.canvas_h)),
+                             self.background, self.raster_img, scale=scale, resample=resample)
+
+    def render_outlines(self):
+        """Сцена для bucket-fill: белый фон и только контуры фигур."""
+        from PIL import Image, ImageDraw
+        W, H = max(2, int(self.canvas_w)), max(2, int(self.canvas_h))
+        scene = Image.new("RGB", (W, H), (255, 255, 255))
+        draw = ImageDraw.Draw(scene)
+        for s in self.shapes:
+            draw_shape(draw, s, fill=False)
+        return scene
+
+    # ---------- Сериализация ----------
+    def to_dict(self):
+        data = {"meta": {"w": self.canvas_w, "h": self.canvas_h, "bg": self.background},
+                "shapes": self.shapes}
+        if self.raster_img is not None:
+            data["raster"] = {"tile": self.RASTER_TILE, "tiles": self._raster_tiles()}
+        return data
+
+    def load_dict(self, data):
+        """Заменяет содержимое документом из JSON-структуры (старый формат — просто список фигур)."""
+        if isinstance(data, list):
+            self.shapes = data
+            self.raster_img = None
+        else:
+            meta = data.get("meta", {})
+            self.canvas_w = int(meta.get("w", self.canvas_w))
+            self.canvas_h = int(meta.get("h", self.canvas_h))
+            self.background = meta.get("bg", self.background)
+            self.shapes = data.get("shapes", [])
+            self.raster_img = self._raster_from(data.get("raster"))
+        self._undo_stack.clear()
+        self.revision += 1
+        self.generation += 1
+        return self
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def load(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return self.load_dict(json.load(f))
+
+    @classmethod
+    def open(cls, path):
+        return cls().load(path)
+
+    def raster_tiles(self):
+        """Генератор непустых тайлов растрового слоя: (x, y, RGBA-тайл, PNG-байты)."""
+        T = self.RASTER_TILE
+        W, H = self.raster_img.size
+        for y in range(0, H, T):
+            for x in range(0, W, T):
+                tile = self.raster_img.crop((x, y, min(x + T, W), min(y + T, H)))
+                if tile.getextrema()[3][1] == 0:
+                    continue  # полностью прозрачный
+                buf = io.BytesIO()
+                tile.save(buf, "PNG", optimize=True)
+                yield x, y, tile, buf.getvalue()
+
+    def _raster_tiles(self):
+        return [[x, y, base64.b64encode(png).decode("ascii")] for x, y, _, png in self.raster_tiles()]
+
+    def _raster_from(self, raster):
+        if not raster or not PIL_AVAILABLE:
+            return None
+        from PIL import Image
+        img = Image.new("RGBA", (max(2, int(self.canvas_w)), max(2, int(self.canvas_h))), (0, 0, 0, 0))
+        for x, y, b64 in raster.get("tiles", []):
+            tile = Image.open(io.BytesIO(base64.b64decode(b64))).convert("RGBA")
+            img.paste(tile, (int(x), int(y)))
+        return img
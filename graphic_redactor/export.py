@@ -0,0 +1,168 @@
+"""Экспорт документа в файл — общий для Editor.export_as и CLI.
+
+Большие холсты рендерятся полосами/тайлами: в памяти одновременно только одна полоса,
+фигуры для неё берутся из пространственного индекса, PNG пишется потоково.
+Полосы можно рисовать параллельно в процессах — каждому уходят только его фигуры и кусок растра.
+Сглаживание (aa=2..4) рисует каждую полосу крупнее и уменьшает её, поэтому память тоже ограничена полосой.
+SVG / PDF не растрируются вовсе — см. vector.py.
+"""
+import os
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .geometry import index_query, spatial_index
+from .render import AA_PAD, render_region, seam_pad
+from .vector import write_pdf, write_svg
+
+FORMATS = {"png": "PNG", "jpg": "JPEG", "jpeg": "JPEG", "bmp": "BMP", "svg": "SVG", "pdf": "PDF"}
+VECTOR = {"SVG": write_svg, "PDF": write_pdf}
+STREAM_PIXELS = 64_000_000  # крупнее (~190 МБ RGB) — PNG пишется полосами автоматически
+BAND = 512                   # высота полосы / размер тайла и ячейки индекса по умолчанию
+PARALLEL_PIXELS = 8_000_000  # от такого размера экспорт по умолчанию рисует полосы во всех ядрах
+
+
+def format_for(path, fmt=None):
+    """PIL-формат по явному имени или по расширению файла."""
+    key = (fmt or os.path.splitext(path)[1].lstrip(".") or "png").lower()
+    if key not in FORMATS:
+        raise ValueError(f"Белгісіз формат: {key}")
+    return FORMATS[key]
+
+
+def export_document(doc, path, fmt=None, band=None, jobs=None, aa=1, aa_filter="lanczos"):
+    """Рендерит документ и сохраняет в path (PNG/JPEG/BMP; SVG/PDF — векторно, опции рендера не нужны).
+    band — высота полосы для потокового PNG; по умолчанию включается сам для холстов > STREAM_PIXELS.
+    jobs — процессов для полос; None — все ядра для холстов от PARALLEL_PIXELS, иначе 1.
+    aa — коэффициент суперсэмплинга (1 — без сглаживания), aa_filter — "box" или "lanczos"."""
+    fmt = format_for(path, fmt)
+    if fmt in VECTOR:
+        return VECTOR[fmt](doc, path)
+    W, H = int(doc.canvas_w), int(doc.canvas_h)
+    # при суперсэмплинге в памяти полоса в aa² раз больше — порог считаем по ней
+    if band is None and fmt == "PNG" and W * H * aa * aa > STREAM_PIXELS:
+        band = max(16, BAND // aa)
+    if band and fmt != "PNG":
+        raise ValueError("Жолақпен экспорт тек PNG үшін")
+    if jobs is None:
+        jobs = (os.cpu_count() or 1) if W * H * aa * aa >= PARALLEL_PIXELS else 1
+    quality = {"scale": aa, "resample": aa_filter}
+    if jobs > 1:
+        bands = render_bands_parallel(doc, band_boxes(W, H, band or max(16, BAND // aa)), jobs, **quality)
+        if band:
+            write_png_stream(path, W, H, (img for _, img in bands))
+        else:
+            img = _stitch(W, H, bands)
+            img.save(path, format=fmt)
+        return path
+    if band:
+        write_png_stream(path, W, H, (img for _, img in render_tiles(doc, band_boxes(W, H, band), **quality)))
+        return path
+    img = doc.render(**quality)
+    img.save(path, format=fmt)
+    return path
+
+
+def export_tiles(doc, out_dir, tile=BAND, stem="tile", aa=1, aa_filter="lanczos"):
+    """Набор PNG-тайлов out_dir/{stem}_{x}_{y}.png; возвращает список путей."""
+    os.makedirs(out_dir, exist_ok=True)
+    W, H = int(doc.canvas_w), int(doc.canvas_h)
+    boxes = [(x, y, min(x + tile, W), min(y + tile, H)) for y in range(0, H, tile) for x in range(0, W, tile)]
+    paths = []
+    for box, img in render_tiles(doc, boxes, scale=aa, resample=aa_filter):
+        p = os.path.join(out_dir, f"{stem}_{box[0]}_{box[1]}.png")
+        img.save(p, "PNG")
+        paths.append(p)
+    return paths
+
+
+def band_boxes(W, H, band):
+    return [(0, y, W, min(y + band, H)) for y in range(0, H, band)]
+
+
+def render_tiles(doc, boxes, cell=BAND, scale=1, resample="lanczos"):
+    """Генератор (box, RGB-изображение): каждая область рисует только свои фигуры из индекса
+    (с перекрытием seam_pad) — результат совпадает с целым рендером попиксельно."""
+    grid = spatial_index(doc.shapes, cell)
+    pad = seam_pad(doc.shapes)
+    for box in boxes:
+        area = _grow(box, scale, pad, doc)
+        yield box, render_region(doc.shapes, box, doc.background, doc.raster_img, index_query(grid, cell, area),
+                                 scale=scale, resample=resample, render_box=area)
+
+
+def render_bands_parallel(doc, boxes, jobs, cell=BAND, scale=1, resample="lanczos"):
+    """Как render_tiles, но области рисуются в jobs процессах; порядок сохраняется.
+    В работе не больше 2*jobs областей, чтобы готовые полосы не копились в памяти."""
+    grid = spatial_index(doc.shapes, cell)
+    raster = doc.raster_img
+    pad = seam_pad(doc.shapes)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = deque()
+        for box in boxes:
+            area = _grow(box, scale, pad, doc)
+            shapes = [doc.shapes[i] for i in index_query(grid, cell, area)]
+            part = raster.crop(area) if raster is not None else None
+            pending.append((box, pool.submit(_render_band_job, shapes, box, area, doc.background, part,
+                                             scale, resample)))
+            if len(pending) >= 2 * jobs:
+                b, fut = pending.popleft()
+                yield b, fut.result()
+        while pending:
+            b, fut = pending.popleft()
+            yield b, fut.result()
+
+
+def _render_band_job(shapes, box, area, background, raster_part, scale, resample):
+    # в воркере: только фигуры полосы и вырезанный кусок растра (с перекрытием и полями сглаживания)
+    return render_region(shapes, box, background, raster_part, raster_origin=area[:2],
+                         scale=scale, resample=resample, render_box=area)
+
+
+def _grow(box, scale, pad, doc):
+    """Область, которая рисуется для box: перекрытие pad плюс поля сглаживания, но не дальше,
+    чем рисует целый рендер (холст + AA_PAD) — там он сам обрезает фигуры."""
+    edge = AA_PAD if scale != 1 else 0
+    pad += edge
+    return (max(box[0] - pad, -edge), max(box[1] - pad, -edge),
+            min(box[2] + pad, int(doc.canvas_w) + edge), min(box[3] + pad, int(doc.canvas_h) + edge))
+
+
+def _stitch(W, H, parts):
+    from PIL import Image
+    img = None
+    for box, part in parts:
+        if img is None:
+            img = Image.new(part.mode, (W, H))
+        img.paste(part, box[:2])
+    return img
+
+
+def write_png_stream(path, width, height, bands, level=6):
+    """Пишет 8-битный RGB PNG из последовательности полос ширины width (сверху вниз).
+    PIL умеет сохранять только целое изображение, поэтому IDAT собираем сами через zlib."""
+    stride = width * 3
+    rows_left = height
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        _png_chunk(f, b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        z = zlib.compressobj(level)
+        for img in bands:
+            raw = img.convert("RGB").tobytes()
+            # фильтр 0 (None) в начале каждой строки
+            data = z.compress(b"".join(b"\x00" + raw[i:i + stride] for i in range(0, len(raw), stride)))
+            rows_left -= len(raw) // stride
+            if data:
+                _png_chunk(f, b"IDAT", data)
+        if rows_left != 0:
+            raise ValueError("Жолақтар биіктігі суретке сәйкес емес")
+        _png_chunk(f, b"IDAT", z.flush())
+        _png_chunk(f, b"IEND", b"")
+
+
+def _png_chunk(f, tag, data):
+    f.write(struct.pack(">I", len(data)))
+    f.write(tag)
+    f.write(data)
+    f.write(struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF))
@@ -0,0 +1,214 @@
+"""Геометрия фигур без Tk и PIL: габариты, упрощение штрихов, кривые Безье."""
+import math
+
+
+def shape_bbox(s):
+    """Габариты фигуры с учётом толщины линии: (x0, y0, x1, y1) или None."""
+    c = s.get("coords") or []
+    if len(c) < 2:
+        return None
+    xs, ys = c[0::2], c[1::2]
+    pad = int(s.get("width", 2)) // 2 + 2
+    return (int(min(xs)) - pad, int(min(ys)) - pad, int(max(xs)) + pad + 1, int(max(ys)) + pad + 1)
+
+
+def simplify_points(coords, tolerance):
+    """Ramer–Douglas–Peucker для плоского списка [x0, y0, x1, y1, ...].
+    Убирает точки, отстоящие от упрощённой ломаной не дальше tolerance px; концы сохраняются."""
+    n = len(coords) // 2
+    if tolerance <= 0 or n < 3:
+        return list(coords)
+    xs, ys = coords[0::2], coords[1::2]
+    keep = [False] * n
+    keep[0] = keep[n - 1] = True
+    tol2 = tolerance * tolerance
+    stack = [(0, n - 1)]
+    while stack:
+        a, b = stack.pop()
+        ax, ay = xs[a], ys[a]
+        dx, dy = xs[b] - ax, ys[b] - ay
+        seglen2 = dx * dx + dy * dy
+        best, split = tol2, -1
+        for i in range(a + 1, b):
+            px, py = xs[i] - ax, ys[i] - ay
+            t = 0 if seglen2 == 0 else max(0, min(1, (px * dx + py * dy) / seglen2))
+            ex, ey = px - t * dx, py - t * dy
+            d2 = ex * ex + ey * ey
+            if d2 > best:
+                best, split = d2, i
+        if split >= 0:
+            keep[split] = True
+            stack.append((a, split))
+            stack.append((split, b))
+    out = []
+    for i in range(n):
+        if keep[i]:
+            out += (xs[i], ys[i])
+    return out
+
+
+# ---------- Кривые Безье для штрихов пера ----------
+# "bezier": coords = [p0, c1, c2, p1, c1, c2, p2, ...] — кусочно-кубическая кривая,
+# тот же формат, что у Tk create_line(..., smooth="raw").
+def _unit(a, b):
+    dx, dy = a[0] - b[0], a[1] - b[1]
+    d = math.hypot(dx, dy)
+    return (dx / d, dy / d) if d else (0.0, 0.0)
+
+
+def _bez_at(b, t):
+    mt = 1 - t
+    k0, k1, k2, k3 = mt * mt * mt, 3 * mt * mt * t, 3 * mt * t * t, t * t * t
+    return (k0 * b[0][0] + k1 * b[1][0] + k2 * b[2][0] + k3 * b[3][0],
+            k0 * b[0][1] + k1 * b[1][1] + k2 * b[2][1] + k3 * b[3][1])
+
+
+def _bez_heuristic(p0, p3, t1, t2):
+    d = math.hypot(p3[0] - p0[0], p3[1] - p0[1]) / 3
+    return [p0, (p0[0] + t1[0] * d, p0[1] + t1[1] * d), (p3[0] + t2[0] * d, p3[1] + t2[1] * d), p3]
+
+
+def _bez_generate(pts, first, last, u, t1, t2):
+    """Управляющие точки по МНК при заданных касательных на концах."""
+    p0, p3 = pts[first], pts[last]
+    c00 = c01 = c11 = x0 = x1 = 0.0
+    for i, t in enumerate(u):
+        mt = 1 - t
+        b0, b1, b2, b3 = mt * mt * mt, 3 * mt * mt * t, 3 * mt * t * t, t * t * t
+        a1 = (t1[0] * b1, t1[1] * b1)
+        a2 = (t2[0] * b2, t2[1] * b2)
+        c00 += a1[0] * a1[0] + a1[1] * a1[1]
+        c01 += a1[0] * a2[0] + a1[1] * a2[1]
+        c11 += a2[0] * a2[0] + a2[1] * a2[1]
+        p = pts[first + i]
+        rx = p[0] - (p0[0] * (b0 + b1) + p3[0] * (b2 + b3))
+        ry = p[1] - (p0[1] * (b0 + b1) + p3[1] * (b2 + b3))
+        x0 += a1[0] * rx + a1[1] * ry
+        x1 += a2[0] * rx + a2[1] * ry
+    det = c00 * c11 - c01 * c01
+    al = (x0 * c11 - x1 * c01) / det if det else 0.0
+    ar = (c00 * x1 - c01 * x0) / det if det else 0.0
+    eps = 1e-6 * math.hypot(p3[0] - p0[0], p3[1] - p0[1])
+    if al < eps or ar < eps:
+        return _bez_heuristic(p0, p3, t1, t2)
+    return [p0, (p0[0] + t1[0] * al, p0[1] + t1[1] * al), (p3[0] + t2[0] * ar, p3[1] + t2[1] * ar), p3]
+
+
+def _bez_max_error(pts, first, u, b):
+    err, split = 0.0, (first + first + len(u) - 1) // 2
+    for i in range(1, len(u) - 1):
+        x, y = _bez_at(b, u[i])
+        p = pts[first + i]
+        d2 = (x - p[0]) ** 2 + (y - p[1]) ** 2
+        if d2 >= err:
+            err, split = d2, first + i
+    return err, split
+
+
+def _bez_newton(b, p, t):
+    """Один шаг Ньютона: уточняет параметр t точки p на кривой b."""
+    q = _bez_at(b, t)
+    q1 = [(3 * (b[i + 1][0] - b[i][0]), 3 * (b[i + 1][1] - b[i][1])) for i in range(3)]
+    q2 = [(2 * (q1[i + 1][0] - q1[i][0]), 2 * (q1[i + 1][1] - q1[i][1])) for i in range(2)]
+    mt = 1 - t
+    d1 = (mt * mt * q1[0][0] + 2 * mt * t * q1[1][0] + t * t * q1[2][0],
+          mt * mt * q1[0][1] + 2 * mt * t * q1[1][1] + t * t * q1[2][1])
+    d2 = (mt * q2[0][0] + t * q2[1][0], mt * q2[0][1] + t * q2[1][1])
+    ex, ey = q[0] - p[0], q[1] - p[1]
+    den = d1[0] * d1[0] + d1[1] * d1[1] + ex * d2[0] + ey * d2[1]
+    # вне [0, 1] точка мерилась бы по продолжению кривой, которого нет на холсте
+    return min(1.0, max(0.0, t - (ex * d1[0] + ey * d1[1]) / den)) if den else t
+
+
+def fit_bezier(coords, error):
+    """Аппроксимирует ломаную [x0, y0, ...] кусочно-кубической кривой Безье с ошибкой не больше error px
+    (алгоритм Шнайдера, Graphics Gems I). Возвращает опорные точки или None."""
+    pts = []
+    for i in range(0, len(coords) - 1, 2):
+        p = (float(coords[i]), float(coords[i + 1]))
+        if not pts or p != pts[-1]:
+            pts.append(p)
+    if len(pts) < 2:
+        return None
+    err2 = error * error
+    out = [pts[0]]
+    # явный стек вместо рекурсии: сегменты обрабатываются слева направо
+    stack = [(0, len(pts) - 1, _unit(pts[1], pts[0]), _unit(pts[-2], pts[-1]))]
+    while stack:
+        first, last, t1, t2 = stack.pop()
+        if last - first == 1:
+            out += _bez_heuristic(pts[first], pts[last], t1, t2)[1:]
+            continue
+        # параметризация по длине хорды
+        u = [0.0]
+        for i in range(first + 1, last + 1):
+            u.append(u[-1] + math.hypot(pts[i][0] - pts[i - 1][0], pts[i][1] - pts[i - 1][1]))
+        u = [v / u[-1] for v in u]
+        b = _bez_generate(pts, first, last, u, t1, t2)
+        e, split = _bez_max_error(pts, first, u, b)
+        if e > err2 and e < err2 * 100:
+            # не сильно промахнулись — уточняем параметризацию, прежде чем делить
+            for _ in range(4):
+                u = [_bez_newton(b, pts[first + i], v) for i, v in enumerate(u)]
+                b = _bez_generate(pts, first, last, u, t1, t2)
+                e, split = _bez_max_error(pts, first, u, b)
+                if e <= err2:
+                    break
+        if e <= err2:
+            out += b[1:]
+            continue
+        tc = _unit(pts[split - 1], pts[split + 1])
+        stack.append((split, last, (-tc[0], -tc[1]), t2))
+        stack.append((first, split, t1, tc))
+    return [round(v, 2) for p in out for v in p]
+
+
+def flatten_bezier(coords, tol=0.5):
+    """Разворачивает опорные точки Безье в ломаную [(x, y), ...] с отклонением не больше tol px
+    (число шагов на сегмент — по формуле Ванга)."""
+    pts = [(coords[i], coords[i + 1]) for i in range(0, len(coords) - 1, 2)]
+    if len(pts) < 4:
+        return pts
+    out = [pts[0]]
+    for k in range(0, len(pts) - 3, 3):
+        b = pts[k:k + 4]
+        m = max(math.hypot(b[0][0] - 2 * b[1][0] + b[2][0], b[0][1] - 2 * b[1][1] + b[2][1]),
+                math.hypot(b[1][0] - 2 * b[2][0] + b[3][0], b[1][1] - 2 * b[2][1] + b[3][1]))
+        n = max(1, min(256, math.ceil(math.sqrt(0.75 * m / tol))))
+        out += [_bez_at(b, j / n) for j in range(1, n + 1)]
+    return out
+
+
+def pen_stroke(raw, tolerance, curve_fit=False):
+    """Штрих пера для хранения: ("pen", RDP-ломаная) или, если curve_fit, ("bezier", опорные точки) —
+    что компактнее."""
+    coords = simplify_points(raw, tolerance)
+    if curve_fit and tolerance > 0:
+        # подгонка по слегка прорежённым точкам: дрожание сэмплов портит касательные
+        bez = fit_bezier(simplify_points(raw, tolerance / 2), tolerance)
+        if bez and len(bez) < len(coords):
+            return "bezier", bez
+    return "pen", coords
+
+
+def spatial_index(shapes, cell):
+    """Сетка cell×cell: (cx, cy) -> [индексы фигур], чьи габариты задевают ячейку."""
+    grid = {}
+    for i, s in enumerate(shapes):
+        b = shape_bbox(s)
+        if b is None:
+            continue
+        for cy in range(b[1] // cell, (b[3] - 1) // cell + 1):
+            for cx in range(b[0] // cell, (b[2] - 1) // cell + 1):
+                grid.setdefault((cx, cy), []).append(i)
+    return grid
+
+
+def index_query(grid, cell, box):
+    """Индексы фигур из spatial_index, задевающих box, в порядке отрисовки."""
+    x0, y0, x1, y1 = box
+    found = set()
+    for cy in range(y0 // cell, (y1 - 1) // cell + 1):
+        for cx in range(x0 // cell, (x1 - 1) // cell + 1):
+            found.update(grid.get((cx, cy), ()))
+    return sorted(found)
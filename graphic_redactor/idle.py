@@ -0,0 +1,152 @@
+"""Кооперативный планировщик фоновой работы на цикле Tk (after / after_idle).
+
+Отложенные задачи (запекание тайлов, обновление миниатюр, предрасчёты) выполняются, когда
+очередь событий пуста и ввода не было input_quiet_ms, кусками не длиннее slice_ms — между
+кусками Tk обрабатывает события. Задача — функция или генератор: генератор продолжается
+с места yield в следующем кусочке времени.
+"""
+import heapq
+import itertools
+import sys
+import time
+import traceback
+
+HIGH, NORMAL, LOW = 0, 5, 10
+
+
+def run_to_end(task):
+    """Выполняет задачу-генератор сразу целиком — когда её результат нужен в этом же обработчике."""
+    if hasattr(task, "__next__"):
+        for _ in task:
+            pass
+
+
+class IdleTask:
+    __slots__ = ("fn", "args", "priority", "key", "due", "seq", "gen", "cancelled")
+
+    def __init__(self, fn, args, priority, key, due, seq):
+        self.fn, self.args, self.priority, self.key, self.due, self.seq = fn, args, priority, key, due, seq
+        self.gen = None
+        self.cancelled = False
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class IdleScheduler:
+    def __init__(self, widget, slice_ms=8, input_quiet_ms=80):
+        self.widget = widget
+        self.slice_ms = slice_ms
+        self.input_quiet_ms = input_quiet_ms
+        self._heap = []
+        self._keys = {}          # key -> IdleTask (повторная постановка заменяет задачу)
+        self._seq = itertools.count()
+        self._job = None
+        self._last_input = 0.0
+        self.stats = {"slices": 0, "done": 0, "errors": 0, "max_slice_ms": 0.0}
+
+    def __len__(self):
+        return sum(1 for t in self._heap if not t.cancelled)
+
+    def add(self, fn, *args, priority=NORMAL, key=None, delay_ms=0):
+        """Ставит fn(*args) в очередь. key — одна задача на ключ: новая заменяет ещё не начатую
+        (уже идущий генератор с тем же ключом отменяется и начинается заново)."""
+        if key is not None:
+            self.cancel(key)
+        task = IdleTask(fn, args, priority, key, time.perf_counter() + delay_ms / 1000, next(self._seq))
+        heapq.heappush(self._heap, task)
+        if key is not None:
+            self._keys[key] = task
+        self._kick()
+        return task
+
+    def cancel(self, task_or_key):
+        task = self._keys.pop(task_or_key, None) if not isinstance(task_or_key, IdleTask) else task_or_key
+        if task is None:
+            return False
+        task.cancelled = True
+        if task.gen is not None:
+            task.gen.close()
+        if task.key is not None and self._keys.get(task.key) is task:
+            del self._keys[task.key]
+        return True
+
+    def clear(self):
+        for task in list(self._heap):
+            self.cancel(task)
+        self._heap.clear()
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._job = None
+
+    def note_input(self):
+        """Вызывается из обработчиков ввода: фоновая работа ждёт, пока пользователь не замрёт."""
+        self._last_input = time.perf_counter()
+
+    def _kick(self, delay_ms=0):
+        if self._job is None and self._heap:
+            if delay_ms > 0:
+                self._job = self.widget.after(delay_ms, self._idle)
+            else:
+                self._job = self.widget.after_idle(self._run)
+
+    def _idle(self):
+        # после таймера — снова ждём пустую очередь событий
+        self._job = self.widget.after_idle(self._run)
+
+    def _run(self):
+        self._job = None
+        now = time.perf_counter()
+        quiet = self._last_input + self.input_quiet_ms / 1000 - now
+        if quiet > 0:
+            self._kick(max(1, int(quiet * 1000)))
+            return
+        deadline = now + self.slice_ms / 1000
+        later = []
+        while self._heap and time.perf_counter() < deadline:
+            task = heapq.heappop(self._heap)
+            if task.cancelled:
+                continue
+            if task.due > time.perf_counter():
+                later.append(task)
+                continue
+            if self._step(task, deadline):
+                heapq.heappush(self._heap, task)  # генератор не закончил — продолжит в следующем куске
+        for task in later:
+            heapq.heappush(self._heap, task)
+        spent = (time.perf_counter() - now) * 1000
+        self.stats["slices"] += 1
+        self.stats["max_slice_ms"] = max(self.stats["max_slice_ms"], spent)
+        live = [t for t in self._heap if not t.cancelled]
+        if not live:
+            self._heap.clear()
+            return
+        wait = min(t.due for t in live) - time.perf_counter()
+        self._kick(max(1, int(wait * 1000)) if wait > 0 else 1)
+
+    def _step(self, task, deadline):
+        """Выполняет задачу (или кусок генератора до deadline); True — если задача ещё не закончена."""
+        try:
+            if task.gen is None:
+                res = task.fn(*task.args)
+                if not hasattr(res, "__next__"):
+                    self._finish(task)
+                    return False
+                task.gen = res
+            while True:
+                next(task.gen)
+                if time.perf_counter() >= deadline:
+                    return True
+        except StopIteration:
+            self._finish(task)
+        except Exception:
+            self.stats["errors"] += 1
+            print(f"[idle] {getattr(task.fn, '__qualname__', task.fn)}:", file=sys.stderr)
+            traceback.print_exc()
+            self._finish(task)
+        return False
+
+    def _finish(self, task):
+        self.stats["done"] += 1
+        if task.key is not None and self._keys.get(task.key) is task:
+            del self._keys[task.key]
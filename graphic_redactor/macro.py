@@ -0,0 +1,135 @@
+"""Макросы ввода: запись press / drag / release / смены инструмента с отметками времени и
+детерминированное воспроизведение в Editor.on_press / on_drag / on_release.
+
+Воспроизведение идёт через настоящий Tk (без дисплея — под xvfb-run), поэтому замеряется
+тот же путь, что и у пользователя: обработчики, кадровый темп, перерисовка холста.
+"""
+import json
+import time
+
+FORMAT = 1
+
+
+class MacroRecorder:
+    def __init__(self):
+        self.events = []
+        self.meta = {}
+        self._t0 = None
+
+    @property
+    def recording(self):
+        return self._t0 is not None
+
+    def start(self, **meta):
+        """meta — исходное состояние: размер холста, инструмент, толщина, цвета."""
+        self.events = []
+        self.meta = meta
+        self._t0 = time.perf_counter()
+
+    def stop(self):
+        self._t0 = None
+
+    def record(self, kind, **data):
+        if self._t0 is not None:
+            self.events.append(dict(t=round(time.perf_counter() - self._t0, 4), kind=kind, **data))
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"format": FORMAT, "meta": self.meta, "events": self.events}, f, ensure_ascii=False)
+
+
+def load_macro(path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("format") != FORMAT:
+        raise ValueError(f"Макрос пішімі қолдау көрсетілмейді: {data.get('format')}")
+    return data
+
+
+class _Event:
+    """Минимальная замена Tk-события для обработчиков Editor."""
+    __slots__ = ("x", "y", "state")
+
+    def __init__(self, x, y, state=0):
+        self.x, self.y, self.state = x, y, state
+
+
+def _apply_settings(editor, ev):
+    if "tool" in ev:
+        editor.current_tool.set(ev["tool"])
+    if "width" in ev:
+        editor.stroke_width.set(ev["width"])
+    if "stroke" in ev:
+        editor.stroke_color = ev["stroke"]
+    if "fill" in ev:
+        editor.fill_color = ev["fill"]
+
+
+def drain(app, pump=None, timeout=120):
+    """Ждёт задачи общего пула процессов app.pool (v4.4+: маска заливки и экспорт асинхронны),
+    прокручивая цикл Tk (по умолчанию app.update) — колбэки пула приходят через after."""
+    pool = getattr(app, "pool", None)
+    pump = pump or getattr(app, "update", None)
+    end = time.perf_counter() + timeout
+    while pool is not None and pump is not None and pool.busy and time.perf_counter() < end:
+        pump()
+        time.sleep(0.002)
+
+
+def replay(editor, macro, speed=None, pump=None):
+    """Скармливает события макроса редактору. speed=None — максимально быстро,
+    иначе множитель реального времени (1.0 — как записано). pump() — прокрутка цикла Tk
+    (app.update) после каждого события, чтобы отрабатывали after-кадры и отрисовка.
+    После щелчка заливкой ждёт пул процессов: fill_ms — от щелчка до наложенной заливки.
+    Координаты в макросе — холста; вид прокручивается в начало, чтобы canvasx(x) == x."""
+    app = getattr(editor, "app", None)
+    pump = pump or (lambda: None)
+    editor.canvas.xview_moveto(0)
+    editor.canvas.yview_moveto(0)
+    _apply_settings(editor, macro.get("meta", {}))
+    handlers = {"press": editor.on_press, "drag": editor.on_drag, "release": editor.on_release}
+    times = {k: [] for k in handlers}
+    fill_times = []
+    start = time.perf_counter()
+    for ev in macro["events"]:
+        if speed:
+            while True:
+                wait = start + ev["t"] / speed - time.perf_counter()
+                if wait <= 0:
+                    break
+                pump()
+                time.sleep(min(wait, 0.002))
+        kind = ev["kind"]
+        if kind == "tool":
+            editor.current_tool.set(ev["tool"])
+            continue
+        if kind == "press":
+            _apply_settings(editor, ev)
+        t0 = time.perf_counter()
+        handlers[kind](_Event(ev["x"], ev["y"], ev.get("state", 0)))
+        times[kind].append((time.perf_counter() - t0) * 1000)
+        pump()
+        if kind == "press" and editor.current_tool.get() == "fill":
+            drain(app, pump)
+            fill_times.append((time.perf_counter() - t0) * 1000)
+    pump()
+    result = {"events": len(macro["events"]), "wall_s": time.perf_counter() - start,
+              "speed": speed or "max", "shapes": len(editor.shapes),
+              "handler_ms": {k: summarize(v) for k, v in times.items()}}
+    if fill_times:
+        result["fill_ms"] = summarize(fill_times)
+    latency = getattr(editor, "_latency_ms", None)  # счётчик HUD, есть не во всех версиях
+    if latency:
+        result["input_to_paint_ms"] = summarize(list(latency))
+    return result
+
+
+def summarize(values):
+    if not values:
+        return {"n": 0}
+    v = sorted(values)
+
+    def pick(q):
+        return round(v[min(len(v) - 1, int(len(v) * q))], 3)
+    return {"n": len(v), "mean": round(sum(v) / len(v), 3), "p50": pick(0.5), "p95": pick(0.95),
+            "max": round(v[-1], 3)}
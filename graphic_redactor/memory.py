@@ -0,0 +1,166 @@
+"""Учёт памяти редактора: примерная разбивка по байтам и разница снимков tracemalloc.
+
+Разбивка обходит атрибуты Editor любой версии (и его Document в v4.4): фигуры и буферы координат,
+стеки истории, растровый слой, PhotoImage и отладочные оверлеи. Пиксели считаются по размеру
+образа (Pillow и Tk держат их вне кучи Python), остальное — sys.getsizeof рекурсивно.
+"""
+import sys
+import tracemalloc
+
+# (категория, имена атрибутов). _undo_stack — снятые undo фигуры, т.е. то, что вернёт redo.
+STACKS = (
+    ("undo", ("history", "_history")),
+    ("redo", ("future", "_future", "_undo_stack")),
+)
+MAX_DEPTH = 6
+
+
+def _is_pil(obj):
+    return hasattr(obj, "getbands") and hasattr(obj, "size")
+
+
+def _is_photo(obj):
+    return type(obj).__name__ == "PhotoImage"
+
+
+def image_bytes(obj):
+    """Пиксели PIL-образа или PhotoImage (Tk хранит 4 байта на пиксель)."""
+    try:
+        if _is_pil(obj):
+            w, h = obj.size
+            return w * h * len(obj.getbands())
+        return int(obj.width()) * int(obj.height()) * 4
+    except Exception:
+        return 0  # уже уничтоженный Tk-образ
+
+
+def deep_size(obj, seen, depth=0):
+    """Байты объекта с содержимым; seen — id уже посчитанных (общие объекты — один раз)."""
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if _is_pil(obj) or _is_photo(obj):
+        return sys.getsizeof(obj) + image_bytes(obj)
+    size = sys.getsizeof(obj)
+    if depth >= MAX_DEPTH:
+        return size
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            size += deep_size(k, seen, depth + 1) + deep_size(v, seen, depth + 1)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for v in obj:
+            size += deep_size(v, seen, depth + 1)
+    return size
+
+
+def _find(objs, name):
+    for o in objs:
+        if name in vars(o):
+            return vars(o)[name]
+    return None
+
+
+def _photos(obj, depth=0):
+    """PhotoImage внутри атрибута (словари тайлов, списки миниатюр)."""
+    if _is_photo(obj):
+        yield obj
+    elif depth < 3 and isinstance(obj, dict):
+        for v in obj.values():
+            yield from _photos(v, depth + 1)
+    elif depth < 3 and isinstance(obj, (list, tuple)):
+        for v in obj:
+            yield from _photos(v, depth + 1)
+
+
+def breakdown(editor):
+    """{категория: байты} для Editor любой версии или для Document.
+    Порядок важен: общие объекты относятся к первой категории, где встретились."""
+    owners = [editor]
+    doc = getattr(editor, "doc", None)
+    if doc is not None and not isinstance(doc, dict):  # в v3.0 doc — словарь мета
+        owners.append(doc)
+    seen = set()
+    out = {}
+    shapes = _find(owners, "shapes")
+    if shapes is None:
+        shapes = getattr(editor, "shapes", [])
+    coords = [s["coords"] for s in shapes if isinstance(s, dict) and "coords" in s]
+    out["coords"] = sum(deep_size(c, seen) for c in coords)
+    out["shapes"] = deep_size(shapes, seen)
+    for category, names in STACKS:
+        stacks = [_find(owners, n) for n in names]
+        out[category] = sum(deep_size(st, seen) for st in stacks if st is not None)
+    raster = _find(owners, "raster_img")
+    out["raster_img"] = deep_size(raster, seen) if raster is not None else 0
+    debug = photos = 0
+    for o in owners:
+        for name, value in vars(o).items():
+            if name.startswith("_dbg"):
+                debug += deep_size(value, seen)
+            else:
+                photos += sum(deep_size(p, seen) for p in _photos(value))
+    out["photoimages"] = photos
+    out["debug"] = debug
+    canvas = getattr(editor, "canvas", None)
+    if canvas is not None and hasattr(canvas, "find_all"):
+        try:
+            out["canvas_items"] = len(canvas.find_all())  # не байты: сами элементы живут в Tk
+        except Exception:
+            pass
+    return out
+
+
+def _human(n):
+    for unit in ("B", "KiB", "MiB"):
+        if n < 1024 or unit == "MiB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def format_breakdown(sizes):
+    lines = []
+    total = 0
+    for k, v in sizes.items():
+        if k == "canvas_items":
+            continue
+        total += v
+        lines.append(f"{k:<12} {_human(v):>12}")
+    lines.append(f"{'total':<12} {_human(total):>12}")
+    if "canvas_items" in sizes:
+        lines.append(f"{'canvas items':<12} {sizes['canvas_items']:>12}")
+    return lines
+
+
+class TraceSnapshots:
+    """Снимки tracemalloc по ходу сессии: take() в интересные моменты, diff() — что выросло между ними.
+    tracemalloc включается первым снимком (до этого аллокации не отслеживаются) и замедляет работу."""
+
+    def __init__(self, frames=1):
+        self.frames = frames
+        self.snapshots = []  # [(метка, Snapshot)]
+
+    def take(self, label=None):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        snap = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        self.snapshots.append((label or f"#{len(self.snapshots) + 1}", snap))
+        return len(self.snapshots) - 1
+
+    def diff(self, a=-2, b=-1, limit=15, key="lineno"):
+        """Строки: метки снимков, общий прирост и top-limit мест по росту памяти."""
+        (la, sa), (lb, sb) = self.snapshots[a], self.snapshots[b]
+        stats = sb.compare_to(sa, key)
+        grown = sum(s.size_diff for s in stats)
+        lines = [f"{la} -> {lb}: {grown / 2 ** 20:+.2f} MiB"]
+        for s in stats[:limit]:
+            frame = s.traceback[0]
+            lines.append(f"{s.size_diff / 1024:+10.1f} KiB {s.count_diff:+7d}  {frame.filename}:{frame.lineno}")
+        return lines
+
+    def stop(self):
+        self.snapshots.clear()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
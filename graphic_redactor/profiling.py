@@ -0,0 +1,131 @@
+"""Профилирование операций редактора: спаны времени в JSONL-трассу и cProfile по запросу.
+
+Трасса пишется в формате Chrome Trace Event ("[" и по событию "X" на строку, закрывающая скобка
+не обязательна) — открывается в chrome://tracing, Perfetto и speedscope как есть.
+Выключенный трассировщик стоит одну проверку атрибута на вызов.
+"""
+import cProfile
+import functools
+import json
+import os
+import threading
+import time
+
+from .cache import CACHE_ROOT
+
+TRACE_DIR = os.path.join(CACHE_ROOT, "traces")
+
+
+def _stamp():
+    return time.strftime("%Y%m%d-%H%M%S")
+
+
+class Tracer:
+    def __init__(self):
+        self.path = None
+        self._f = None
+        self._t0 = time.perf_counter()
+        self._pid = os.getpid()
+
+    @property
+    def enabled(self):
+        return self._f is not None
+
+    def start(self, path=None):
+        """Начинает трассу (по умолчанию — новый файл в TRACE_DIR); возвращает путь."""
+        self.stop()
+        if path is None:
+            os.makedirs(TRACE_DIR, exist_ok=True)
+            path = os.path.join(TRACE_DIR, f"trace-{_stamp()}.jsonl")
+        self._f = open(path, "w", encoding="utf-8", buffering=1 << 16)
+        self._f.write("[\n")
+        self.path = path
+        self._event({"name": "process_name", "ph": "M", "args": {"name": "graphic-redactor"}})
+        return path
+
+    def stop(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def _event(self, ev):
+        ev.setdefault("pid", self._pid)
+        ev.setdefault("tid", threading.get_ident())
+        self._f.write(json.dumps(ev, ensure_ascii=False) + ",\n")
+
+    def complete(self, name, start, end, args=None):
+        """Событие "X" по двум отметкам perf_counter."""
+        if self._f is None:
+            return
+        ev = {"name": name, "cat": "editor", "ph": "X",
+              "ts": round((start - self._t0) * 1e6, 1), "dur": round((end - start) * 1e6, 1)}
+        if args:
+            ev["args"] = args
+        self._event(ev)
+
+    def span(self, name, **args):
+        return _Span(self, name, args)
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer, name, args):
+        self.tracer, self.name, self.args = tracer, name, args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.complete(self.name, self.start, time.perf_counter(), self.args or None)
+        return False
+
+
+TRACER = Tracer()
+if os.environ.get("GRAPHIC_REDACTOR_TRACE"):
+    TRACER.start(os.environ["GRAPHIC_REDACTOR_TRACE"])  # трасса полевой сессии с первого события
+
+
+def traced(name=None):
+    """Декоратор: вызов функции — спан в TRACER, если трасса включена."""
+    def wrap(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def inner(*a, **k):
+            if TRACER._f is None:
+                return fn(*a, **k)
+            start = time.perf_counter()
+            try:
+                return fn(*a, **k)
+            finally:
+                TRACER.complete(label, start, time.perf_counter())
+        return inner
+    return wrap
+
+
+class Profiler:
+    """cProfile по выбранному взаимодействию: start() ... stop() -> путь к .prof (snakeviz, pstats)."""
+
+    def __init__(self):
+        self._prof = None
+
+    @property
+    def running(self):
+        return self._prof is not None
+
+    def start(self):
+        self._prof = cProfile.Profile()
+        self._prof.enable()
+
+    def stop(self, path=None):
+        if self._prof is None:
+            return None
+        self._prof.disable()
+        if path is None:
+            os.makedirs(TRACE_DIR, exist_ok=True)
+            path = os.path.join(TRACE_DIR, f"profile-{_stamp()}.prof")
+        self._prof.dump_stats(path)
+        self._prof = None
+        return path
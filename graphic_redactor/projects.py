@@ -0,0 +1,102 @@
+"""Недавние проекты для главного меню: список, сведения и миниатюры с дисковым кэшем.
+
+project_info выполняется в процессе-воркере: разбор большого JSON не блокирует Tk.
+Кэш — по пути, mtime и размеру файла, поэтому изменённый проект перерисуется сам.
+"""
+import hashlib
+import json
+import os
+
+from .cache import CACHE_ROOT
+from .document import Document
+from .render import render_region
+
+RECENT_FILE = os.path.join(CACHE_ROOT, "recent.json")
+THUMB_DIR = os.path.join(CACHE_ROOT, "thumbs")
+RECENT_MAX = 6
+THUMB = 160  # длинная сторона миниатюры, px
+
+
+# ---------- Список недавних ----------
+def load_recent(recent_file=RECENT_FILE):
+    """Существующие пути из списка, новые первыми."""
+    try:
+        with open(recent_file, "r", encoding="utf-8") as f:
+            paths = json.load(f).get("recent", [])
+    except (OSError, ValueError):
+        return []
+    return [p for p in paths if os.path.isfile(p)][:RECENT_MAX]
+
+
+def add_recent(path, recent_file=RECENT_FILE):
+    path = os.path.abspath(path)
+    paths = [path] + [p for p in load_recent(recent_file) if p != path]
+    os.makedirs(os.path.dirname(recent_file), exist_ok=True)
+    with open(recent_file, "w", encoding="utf-8") as f:
+        json.dump({"recent": paths[:RECENT_MAX]}, f, ensure_ascii=False, indent=2)
+
+
+# ---------- Сведения и миниатюры ----------
+def _key(path):
+    st = os.stat(path)
+    raw = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def cached_info(path, thumb_dir=THUMB_DIR):
+    """Готовые сведения из кэша или None — дёшево, можно звать из Tk."""
+    try:
+        with open(os.path.join(thumb_dir, _key(path) + ".json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def project_info(path, thumb_dir=THUMB_DIR, size=THUMB):
+    """Открывает проект, рисует миниатюру и кладёт всё в кэш. Для воркера: возвращает dict
+    {path, w, h, shapes, thumb} или {path, error} (ошибка тоже кэшируется до изменения файла)."""
+    try:
+        key = _key(path)
+    except OSError as e:
+        return {"path": path, "error": f"{type(e).__name__}: {e}"}
+    os.makedirs(thumb_dir, exist_ok=True)
+    try:
+        doc = Document.open(path)
+        thumb = os.path.join(thumb_dir, key + ".png")
+        render_thumbnail(doc, size).save(thumb, "PNG")
+        info = {"path": path, "w": int(doc.canvas_w), "h": int(doc.canvas_h),
+                "shapes": len(doc.shapes), "thumb": thumb}
+    except Exception as e:
+        info = {"path": path, "error": f"{type(e).__name__}: {e}"}
+    with open(os.path.join(thumb_dir, key + ".json"), "w", encoding="utf-8") as f:
+        json.dump(info, f, ensure_ascii=False)
+    return info
+
+
+def render_thumbnail(doc, size=THUMB):
+    """Миниатюра — тот же render_region, что у экспорта, уменьшенный до size по длинной стороне."""
+    from PIL import Image
+    W, H = max(1, int(doc.canvas_w)), max(1, int(doc.canvas_h))
+    img = render_region(doc.shapes, (0, 0, W, H), doc.background, doc.raster_img)
+    img.thumbnail((size, size), Image.LANCZOS)  # только уменьшает
+    return img
+
+
+def prune_thumbs(paths, thumb_dir=THUMB_DIR):
+    """Удаляет миниатюры, не относящиеся к текущим версиям файлов paths (после сохранений копятся старые)."""
+    keep = set()
+    for p in paths:
+        try:
+            keep.add(_key(p))
+        except OSError:
+            pass
+    try:
+        names = os.listdir(thumb_dir)
+    except OSError:
+        return
+    for name in names:
+        if os.path.splitext(name)[0] not in keep:
+            try:
+                os.remove(os.path.join(thumb_dir, name))
+            except OSError:
+                pass
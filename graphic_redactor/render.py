@@ -0,0 +1,87 @@
+"""PIL-рендер фигур: общий для экспорта, заливки, растровых тайлов и пакетной обработки."""
+import importlib.util
+import math
+
+from .geometry import flatten_bezier
+
+# Pillow импортируется лениво, в функциях рендера: запуск GUI и CLI без экспорта его не ждёт
+PIL_AVAILABLE = importlib.util.find_spec("PIL") is not None
+
+
+AA_PAD = 3  # радиус Lanczos в выходных пикселях
+
+
+def seam_pad(shapes):
+    """Перекрытие соседних полос: половина самой толстой линии + 1 px. PIL обрезает толстые линии
+    и скругления стыков по краю образа иначе, чем рисует их целиком, поэтому полоса рисуется
+    с таким запасом и обрезается — иначе на границах полос остаются швы."""
+    return max((int(s.get("width", 2)) for s in shapes), default=0) // 2 + 1
+
+
+def draw_shape(draw, s, dx=0, dy=0, fill=True, scale=1):
+    """Рисует фигуру через ImageDraw со сдвигом (dx, dy) и масштабом scale (для суперсэмплинга).
+    fill=False — только контуры."""
+    t = s["type"]; coords = s["coords"]
+    stroke = s.get("stroke", "#000"); width = max(1, round(int(s.get("width", 2)) * scale))
+    # пиксель i холста — это пиксели i*scale … i*scale+scale-1 крупного образа с центром в
+    # i*scale + (scale-1)/2; координаты округляются к ближайшему крупному пикселю. Точки привязываются
+    # к сетке до сдвига: иначе округление зависит от dx/dy, и полоса рисует штрих иначе, чем целый рендер
+    c = (scale - 1) / 2 + 0.5  # + 0.5 — округление через floor
+    if t in ("pen", "bezier"):
+        if t == "bezier":
+            coords = [v for p in flatten_bezier(coords, 0.5 / scale) for v in p]
+        pts = [(math.floor(coords[i] * scale + c) + dx * scale, math.floor(coords[i + 1] * scale + c) + dy * scale)
+               for i in range(0, len(coords) - 1, 2)]
+        if len(pts) >= 2:
+            draw.line(pts, fill=stroke, width=width, joint="curve")
+    elif t == "line":
+        x0, y0, x1, y1 = map(int, coords)
+        o = math.floor(c)
+        draw.line([((x0 + dx) * scale + o, (y0 + dy) * scale + o), ((x1 + dx) * scale + o, (y1 + dy) * scale + o)],
+                  fill=stroke, width=width)
+    elif t in ("rect", "oval"):
+        x0, y0, x1, y1 = map(int, coords)
+        o = math.floor(c)
+        box = [(min(x0, x1) + dx) * scale + o, (min(y0, y1) + dy) * scale + o,
+               (max(x0, x1) + dx) * scale + o, (max(y0, y1) + dy) * scale + o]
+        f = (s.get("fill") or None) if fill else None
+        if t == "rect":
+            draw.rectangle(box, outline=stroke, width=width, fill=f)
+        else:
+            draw.ellipse(box, outline=stroke, width=width, fill=f)
+
+
+def render_region(shapes, box, background=None, raster_img=None, indices=None, raster_origin=(0, 0),
+                  scale=1, resample="lanczos", render_box=None):
+    """Собирает фон + растровый слой + фигуры для области box=(x0, y0, x1, y1).
+    background=None — прозрачный RGBA (тайлы поверх Tk-фона), иначе RGB.
+    raster_origin — где на холсте лежит левый верхний угол raster_img (если передан уже вырезанный кусок).
+    scale > 1 — сглаживание: рисуем в scale раз крупнее и уменьшаем фильтром resample ("box" / "lanczos").
+    Тогда область расширяется на AA_PAD px, чтобы фильтр у краёв видел соседей.
+    render_box — область, которая рисуется на самом деле (содержит box); результат вырезается из неё.
+    Экспорт полосами передаёт её с перекрытием seam_pad, чтобы полосы совпадали с целым рендером."""
+    size = (max(1, box[2] - box[0]), max(1, box[3] - box[1]))
+    if render_box is None:
+        pad = AA_PAD if scale != 1 else 0
+        render_box = (box[0] - pad, box[1] - pad, box[0] + size[0] + pad, box[1] + size[1] + pad)
+    x0, y0, x1, y1 = render_box
+    from PIL import Image, ImageDraw, ImageColor
+    big = ((x1 - x0) * scale, (y1 - y0) * scale)
+    if background is None:
+        img = Image.new("RGBA", big, (0, 0, 0, 0))
+    else:
+        img = Image.new("RGB", big, ImageColor.getrgb(background))
+    if raster_img is not None:
+        ox, oy = raster_origin
+        part = raster_img.crop((x0 - ox, y0 - oy, x1 - ox, y1 - oy))
+        if scale != 1:
+            part = part.resize(big, Image.NEAREST)  # заливка попиксельная — сглаживать её нечего
+        img.paste(part, (0, 0), part)
+    draw = ImageDraw.Draw(img)
+    for i in (range(len(shapes)) if indices is None else indices):
+        draw_shape(draw, shapes[i], -x0, -y0, scale=scale)
+    if scale != 1:
+        img = img.resize((x1 - x0, y1 - y0), getattr(Image, resample.upper()))
+    if (x0, y0, x1, y1) != (box[0], box[1], box[0] + size[0], box[1] + size[1]):
+        img = img.crop((box[0] - x0, box[1] - y0, box[0] - x0 + size[0], box[1] - y0 + size[1]))
+    return img
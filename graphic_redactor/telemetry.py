@@ -0,0 +1,163 @@
+"""Локальная телеметрия (по желанию): времена операций и размеры документа в ротируемый JSONL.
+
+Ничего не отправляется по сети — файлы собираются вручную и сводятся командой
+python -m graphic_redactor telemetry <файлы или каталоги> (перцентили по операциям).
+Включается пунктом меню «Өнімділік» (флаг-файл в TELEMETRY_DIR) или GRAPHIC_REDACTOR_TELEMETRY=1/0.
+record() только копит события в памяти; на диск их пишет flush() — редактор вызывает его
+из планировщика простоя, остальное дописывается при выходе (atexit).
+"""
+import atexit
+import glob
+import hashlib
+import json
+import os
+import platform
+import time
+import uuid
+
+from .cache import CACHE_ROOT
+
+TELEMETRY_DIR = os.path.join(CACHE_ROOT, "telemetry")
+LOG_NAME = "telemetry.jsonl"
+MAX_BYTES = 1024 * 1024
+BACKUPS = 5
+MAX_PENDING = 512  # столько событий в памяти — дальше flush прямо в record
+PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+class Telemetry:
+    def __init__(self, root=TELEMETRY_DIR, max_bytes=MAX_BYTES, backups=BACKUPS):
+        self.root = root
+        self.path = os.path.join(root, LOG_NAME)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.session = uuid.uuid4().hex[:12]
+        self._pending = []
+        # имя машины не пишется — только короткий хэш, чтобы различать рабочие места при сведении
+        self.host = hashlib.sha256(platform.node().encode("utf-8")).hexdigest()[:12]
+        env = os.environ.get("GRAPHIC_REDACTOR_TELEMETRY")
+        self.enabled = env not in ("", "0") if env is not None else os.path.exists(self._flag)
+
+    @property
+    def _flag(self):
+        return os.path.join(self.root, "enabled")
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def set_enabled(self, on):
+        """Запоминает выбор между запусками (флаг-файл)."""
+        self.flush()  # уже записанное при включённой телеметрии — на диск
+        self.enabled = on
+        try:
+            if on:
+                os.makedirs(self.root, exist_ok=True)
+                open(self._flag, "w").close()
+            elif os.path.exists(self._flag):
+                os.remove(self._flag)
+        except OSError:
+            pass
+
+    def record(self, op, ms, **stats):
+        """Одно событие: ts, session, host, op, ms и размеры документа (shapes, w, h, bytes...).
+        Пишется в буфер — без файловых операций, кроме редкого переполнения MAX_PENDING."""
+        if not self.enabled:
+            return
+        event = {"ts": round(time.time(), 3), "session": self.session, "host": self.host,
+                 "op": op, "ms": round(ms, 3)}
+        event.update(stats)
+        self._pending.append(event)
+        if len(self._pending) >= MAX_PENDING:
+            self.flush()
+
+    def flush(self):
+        """Дописывает накопленные события в лог одним открытием файла."""
+        if not self._pending:
+            return
+        events, self._pending = self._pending, []
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+                self._rotate()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(ev, ensure_ascii=False) + "\n" for ev in events))
+        except OSError:
+            pass  # телеметрия не должна мешать работе
+
+    def _rotate(self):
+        """telemetry.jsonl -> .1 -> .2 ... ; старше backups удаляется."""
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+TELEMETRY = Telemetry()
+atexit.register(TELEMETRY.flush)
+
+
+# ---------- Сведение логов ----------
+def log_files(paths=None):
+    """Файлы логов: каталоги раскрываются в telemetry.jsonl*, маски — glob."""
+    files = []
+    for p in paths or [TELEMETRY_DIR]:
+        if os.path.isdir(p):
+            files += sorted(glob.glob(os.path.join(p, "*.jsonl*")))
+        elif glob.has_magic(p):
+            files += sorted(glob.glob(p))
+        else:
+            files.append(p)
+    return files
+
+
+def read_events(files):
+    """События из всех файлов; битые строки (оборванная запись) пропускаются."""
+    for path in files:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    ev = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(ev, dict) and "op" in ev and "ms" in ev:
+                    yield ev
+
+
+def size_bucket(shapes):
+    """Порядок числа фигур: 0, <10, <100, <1000 ..."""
+    if not shapes:
+        return "0"
+    return f"<{10 ** len(str(int(shapes)))}"
+
+
+def aggregate(events, by_size=False):
+    """{(op, [корзина размера]): {n, hosts, p50, p90, p95, p99, max, shapes_max}} по ms."""
+    groups = {}
+    for ev in events:
+        key = (ev["op"], size_bucket(ev.get("shapes"))) if by_size else (ev["op"],)
+        groups.setdefault(key, []).append(ev)
+    out = {}
+    for key, evs in sorted(groups.items()):
+        ms = sorted(ev["ms"] for ev in evs)
+        n = len(ms)
+        row = {"n": n, "hosts": len({ev.get("host") for ev in evs})}
+        for q in PERCENTILES:
+            row[f"p{int(q * 100)}"] = ms[min(n - 1, int(n * q))]
+        row["max"] = ms[-1]
+        row["shapes_max"] = max((ev.get("shapes") or 0) for ev in evs)
+        out[key] = row
+    return out
+
+
+def report_lines(agg):
+    head = f"{'op':<18} {'n':>7} {'hosts':>5} " + " ".join(
+        f"{'p' + str(int(q * 100)):>9}" for q in PERCENTILES) + f" {'max':>9} {'shapes':>7}"
+    lines = [head, "-" * len(head)]
+    for key, r in agg.items():
+        name = " ".join(key)
+        lines.append(f"{name:<18} {r['n']:>7} {r['hosts']:>5} "
+                     + " ".join(f"{r['p' + str(int(q * 100))]:>9.2f}" for q in PERCENTILES)
+                     + f" {r['max']:>9.2f} {r['shapes_max']:>7}")
+    return lines
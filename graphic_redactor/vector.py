@@ -0,0 +1,196 @@
+"""Векторный экспорт SVG / PDF: фигуры пишутся в файл по одной генератором, без растра всего холста.
+
+Растровый слой заливки встраивается сжатыми тайлами (PNG в SVG, Flate + SMask в PDF),
+в памяти одновременно — одна фигура или один тайл.
+"""
+import base64
+import zlib
+from xml.sax.saxutils import quoteattr
+
+KAPPA = 0.5522847498  # контрольные точки четверти эллипса кубической Безье
+
+
+def _fmt(v):
+    return f"{v:.2f}".rstrip("0").rstrip(".")
+
+
+def _pts(coords):
+    return " ".join(f"{_fmt(coords[i])},{_fmt(coords[i + 1])}" for i in range(0, len(coords) - 1, 2))
+
+
+def _norm_box(coords):
+    x0, y0, x1, y1 = map(int, coords)
+    return min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)
+
+
+# ---------- SVG ----------
+def svg_lines(doc):
+    """Генератор строк SVG-документа: фон, тайлы заливки, затем фигуры в порядке отрисовки."""
+    W, H = int(doc.canvas_w), int(doc.canvas_h)
+    yield ('<?xml version="1.0" encoding="UTF-8"?>\n'
+           f'<svg xmlns="http://www.w3.org/2000/svg" width="{W}" height="{H}" viewBox="0 0 {W} {H}">\n')
+    yield f'<rect x="0" y="0" width="{W}" height="{H}" fill={quoteattr(doc.background)}/>\n'
+    if doc.raster_img is not None:
+        for x, y, tile, png in doc.raster_tiles():
+            yield (f'<image x="{x}" y="{y}" width="{tile.width}" height="{tile.height}" '
+                   f'href="data:image/png;base64,{base64.b64encode(png).decode("ascii")}"/>\n')
+    for s in doc.shapes:
+        el = svg_element(s)
+        if el:
+            yield el + "\n"
+    yield "</svg>\n"
+
+
+def svg_element(s):
+    t = s["type"]; c = s["coords"]
+    stroke = quoteattr(s.get("stroke", "#000")); width = _fmt(s.get("width", 2))
+    line = f'stroke={stroke} stroke-width="{width}" stroke-linecap="round" stroke-linejoin="round" fill="none"'
+    if t == "pen" and len(c) >= 4:
+        return f'<polyline points="{_pts(c)}" {line}/>'
+    if t == "bezier" and len(c) >= 8:
+        segs = " ".join(f"C {_pts(c[i:i + 6])}" for i in range(2, len(c) - 5, 6))
+        return f'<path d="M {_pts(c[:2])} {segs}" {line}/>'
+    if t == "line" and len(c) >= 4:
+        x0, y0, x1, y1 = map(int, c[:4])
+        return f'<line x1="{x0}" y1="{y0}" x2="{x1}" y2="{y1}" stroke={stroke} stroke-width="{width}"/>'
+    if t in ("rect", "oval") and len(c) >= 4:
+        x0, y0, x1, y1 = _norm_box(c)
+        paint = f'stroke={stroke} stroke-width="{width}" fill={quoteattr(s.get("fill") or "none")}'
+        if t == "rect":
+            return f'<rect x="{x0}" y="{y0}" width="{x1 - x0}" height="{y1 - y0}" {paint}/>'
+        return (f'<ellipse cx="{_fmt((x0 + x1) / 2)}" cy="{_fmt((y0 + y1) / 2)}" '
+                f'rx="{_fmt((x1 - x0) / 2)}" ry="{_fmt((y1 - y0) / 2)}" {paint}/>')
+    return None
+
+
+def write_svg(doc, path):
+    with open(path, "w", encoding="utf-8") as f:
+        for chunk in svg_lines(doc):
+            f.write(chunk)
+    return path
+
+
+# ---------- PDF ----------
+class _PdfWriter:
+    """Последовательная запись объектов PDF с таблицей xref; номера объектов резервируются заранее."""
+
+    def __init__(self, f):
+        self.f = f
+        self.offsets = {}
+        self.count = 0
+        f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def reserve(self):
+        self.count += 1
+        return self.count
+
+    def obj(self, num, body):
+        self.offsets[num] = self.f.tell()
+        self.f.write(f"{num} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    def stream(self, num, data, extra=b""):
+        """Поток целиком (тайлы растра — маленькие)."""
+        self.obj(num, b"<< /Length %d /Filter /FlateDecode " % len(data) + extra + b">>\nstream\n"
+                 + data + b"\nendstream")
+
+    def stream_chunks(self, num, chunks):
+        """Поток из генератора байтов: сжимается на лету, длина — отдельным объектом после него."""
+        length_num = self.reserve()
+        self.offsets[num] = self.f.tell()
+        self.f.write(b"%d 0 obj\n<< /Length %d 0 R /Filter /FlateDecode >>\nstream\n" % (num, length_num))
+        start = self.f.tell()
+        z = zlib.compressobj(6)
+        for chunk in chunks:
+            data = z.compress(chunk)
+            if data:
+                self.f.write(data)
+        self.f.write(z.flush())
+        length = self.f.tell() - start
+        self.f.write(b"\nendstream\nendobj\n")
+        self.obj(length_num, b"%d" % length)
+
+    def close(self, root):
+        xref = self.f.tell()
+        self.f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (self.count + 1))
+        for n in range(1, self.count + 1):
+            self.f.write(b"%010d 00000 n \n" % self.offsets[n])
+        self.f.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                     % (self.count + 1, root, xref))
+
+
+def _pdf_rgb(color):
+    from PIL import ImageColor
+    r, g, b = ImageColor.getrgb(color)[:3]
+    return f"{r / 255:.4g} {g / 255:.4g} {b / 255:.4g}"
+
+
+def pdf_ops(s):
+    """Операторы контента PDF для фигуры (координаты холста, ось Y уже перевёрнута в cm)."""
+    t = s["type"]; c = s["coords"]
+    head = f"{_pdf_rgb(s.get('stroke', '#000'))} RG {_fmt(s.get('width', 2))} w "
+    if t in ("pen", "line") and len(c) >= 4:
+        if t == "line":
+            c = [int(v) for v in c[:4]]
+        body = f"{_fmt(c[0])} {_fmt(c[1])} m " + " ".join(
+            f"{_fmt(c[i])} {_fmt(c[i + 1])} l" for i in range(2, len(c) - 1, 2))
+        return head + body + " S\n"
+    if t == "bezier" and len(c) >= 8:
+        body = f"{_fmt(c[0])} {_fmt(c[1])} m " + " ".join(
+            " ".join(_fmt(v) for v in c[i:i + 6]) + " c" for i in range(2, len(c) - 5, 6))
+        return head + body + " S\n"
+    if t in ("rect", "oval") and len(c) >= 4:
+        x0, y0, x1, y1 = _norm_box(c)
+        fill = s.get("fill")
+        paint = "B" if fill else "S"
+        if fill:
+            head += f"{_pdf_rgb(fill)} rg "
+        if t == "rect":
+            return head + f"{x0} {y0} {x1 - x0} {y1 - y0} re {paint}\n"
+        cx, cy, rx, ry = (x0 + x1) / 2, (y0 + y1) / 2, (x1 - x0) / 2, (y1 - y0) / 2
+        kx, ky = rx * KAPPA, ry * KAPPA
+        path = [f"{_fmt(cx + rx)} {_fmt(cy)} m"]
+        for (ax, ay, bx, by, ex, ey) in (
+                (cx + rx, cy + ky, cx + kx, cy + ry, cx, cy + ry),
+                (cx - kx, cy + ry, cx - rx, cy + ky, cx - rx, cy),
+                (cx - rx, cy - ky, cx - kx, cy - ry, cx, cy - ry),
+                (cx + kx, cy - ry, cx + rx, cy - ky, cx + rx, cy)):
+            path.append(" ".join(_fmt(v) for v in (ax, ay, bx, by, ex, ey)) + " c")
+        return head + " ".join(path) + f" h {paint}\n"
+    return ""
+
+
+def write_pdf(doc, path):
+    """Одна страница размером с холст (1 px = 1 pt). Сначала тайлы заливки как XObject, затем поток фигур."""
+    W, H = int(doc.canvas_w), int(doc.canvas_h)
+    with open(path, "wb") as f:
+        pdf = _PdfWriter(f)
+        catalog, pages, page, content = pdf.reserve(), pdf.reserve(), pdf.reserve(), pdf.reserve()
+        images = []  # (имя, x, y, w, h) — только метаданные, сами тайлы уже в файле
+        if doc.raster_img is not None:
+            for x, y, tile, _png in doc.raster_tiles():
+                rgb, alpha = pdf.reserve(), pdf.reserve()
+                w, h = tile.size
+                pdf.stream(alpha, zlib.compress(tile.getchannel("A").tobytes()),
+                           b"/Type /XObject /Subtype /Image /Width %d /Height %d "
+                           b"/ColorSpace /DeviceGray /BitsPerComponent 8 " % (w, h))
+                pdf.stream(rgb, zlib.compress(tile.convert("RGB").tobytes()),
+                           b"/Type /XObject /Subtype /Image /Width %d /Height %d "
+                           b"/ColorSpace /DeviceRGB /BitsPerComponent 8 /SMask %d 0 R " % (w, h, alpha))
+                images.append((f"Im{rgb}", rgb, x, y, w, h))
+
+        def chunks():
+            # ось Y вниз, как на холсте; скругления как у Tk capstyle=ROUND
+            yield f"1 0 0 -1 0 {H} cm 1 J 1 j\n{_pdf_rgb(doc.background)} rg 0 0 {W} {H} re f\n".encode()
+            for name, _num, x, y, w, h in images:
+                yield f"q {w} 0 0 {-h} {x} {y + h} cm /{name} Do Q\n".encode()
+            for s in doc.shapes:
+                yield pdf_ops(s).encode()
+
+        pdf.stream_chunks(content, chunks())
+        xobjects = " ".join(f"/{name} {num} 0 R" for name, num, *_ in images)
+        pdf.obj(page, (f"<< /Type /Page /Parent {pages} 0 R /MediaBox [0 0 {W} {H}] "
+                       f"/Contents {content} 0 R /Resources << /XObject << {xobjects} >> >> >>").encode())
+        pdf.obj(pages, f"<< /Type /Pages /Kids [{page} 0 R] /Count 1 >>".encode())
+        pdf.obj(catalog, f"<< /Type /Catalog /Pages {pages} 0 R >>".encode())
+        pdf.close(catalog)
+    return path
@@ -0,0 +1,270 @@
+"""Сравнение версий редактора ("main v1.0.py" … "main v5.0.py") на одной синтетической нагрузке.
+
+Каждая версия запускается в отдельном процессе (своя память, свой Tk, пустой кэш экспорта) и
+гоняет через настоящий Editor: рисование макросом, undo/redo, заливку, перерисовку и экспорт.
+Нужен дисплей (X / xvfb-run -a); без него версия помечается как пропущенная.
+
+python -m graphic_redactor versions "main v*.py" --strokes 200 --out versions.json
+"""
+import glob
+import inspect
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from .bench import MIX, COLORS, load_editor_module
+from .macro import FORMAT, drain, replay, summarize
+
+EVENT_DT = 0.008  # ~125 Гц, как у обычной мыши
+
+
+def synthetic_macro(strokes=200, points=24, seed=0, size=(1280, 720)):
+    """Макрос рисования: strokes фигур (перо / линия / прямоугольник / эллипс в пропорциях MIX),
+    у каждой — нажатие, points перемещений случайным блужданием и отпускание."""
+    rnd = random.Random(seed)
+    W, H = size
+    kinds, weights = zip(*MIX.items())
+    events, t = [], 0.0
+    for _ in range(strokes):
+        x, y = rnd.uniform(0, W), rnd.uniform(0, H)
+        events.append({"t": round(t, 4), "kind": "press", "x": round(x, 1), "y": round(y, 1), "state": 0,
+                       "tool": rnd.choices(kinds, weights)[0], "width": rnd.choice((1, 2, 3, 5)),
+                       "stroke": rnd.choice(COLORS), "fill": rnd.choice(("",) + COLORS)})
+        for _ in range(points):
+            t += EVENT_DT
+            x = min(W - 1, max(0, x + rnd.uniform(-15, 15)))
+            y = min(H - 1, max(0, y + rnd.uniform(-15, 15)))
+            events.append({"t": round(t, 4), "kind": "drag", "x": round(x, 1), "y": round(y, 1), "state": 0})
+        t += EVENT_DT
+        events.append({"t": round(t, 4), "kind": "release", "x": round(x, 1), "y": round(y, 1), "state": 0})
+        t += 10 * EVENT_DT
+    return {"format": FORMAT, "meta": {"w": W, "h": H}, "events": events}
+
+
+def fill_macro(fills=5, seed=0, size=(1280, 720)):
+    """Макрос заливки: fills щелчков инструментом «Құю» в случайных точках."""
+    rnd = random.Random(seed + 1)
+    W, H = size
+    events = []
+    for i in range(fills):
+        x, y = rnd.randrange(W), rnd.randrange(H)
+        events.append({"t": i * 0.5, "kind": "press", "x": x, "y": y, "state": 0,
+                       "tool": "fill", "fill": rnd.choice(COLORS)})
+        events.append({"t": i * 0.5 + EVENT_DT, "kind": "release", "x": x, "y": y, "state": 0})
+    return {"format": FORMAT, "meta": {"w": W, "h": H}, "events": events}
+
+
+def _rss_mb():
+    """Текущий RSS процесса (Linux); None, если узнать нельзя."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class _Dialogs:
+    """Подменяет диалоги Tk на время экспорта: путь сохранения — заданный, ошибки — в список."""
+
+    def __init__(self, path):
+        self.path = path
+        self.errors = []
+        self._saved = []
+
+    def __enter__(self):
+        from tkinter import filedialog, messagebox
+        patches = [(filedialog, "asksaveasfilename", lambda *a, **k: self.path),
+                   (messagebox, "showerror", lambda title, msg, **k: self.errors.append(msg)),
+                   (messagebox, "showinfo", lambda *a, **k: "ok")]
+        for mod, name, fn in patches:
+            self._saved.append((mod, name, getattr(mod, name)))
+            setattr(mod, name, fn)
+        return self
+
+    def __exit__(self, *exc):
+        for mod, name, fn in self._saved:
+            setattr(mod, name, fn)
+        return False
+
+
+def supports_fill(mod):
+    return '"fill"' in inspect.getsource(mod.Editor.on_press)
+
+
+def run_version(script, strokes=200, points=24, fills=5, seed=0):
+    """Нагрузка на Editor одной версии в текущем процессе; отчёт {script, phases: {фаза: {...}}}."""
+    import tkinter as tk
+    report = {"script": script, "version": version_of(script), "phases": {}}
+    t0 = time.perf_counter()
+    try:
+        mod = load_editor_module(script)
+        app = mod.App()
+    except tk.TclError as e:
+        report["skipped"] = str(e)
+        return report
+    report["startup_s"] = time.perf_counter() - t0
+    tmp = tempfile.mkdtemp(prefix="gr-versions-")
+    try:
+        ed = app.get_frame("Editor") if hasattr(app, "get_frame") else app.frames["Editor"]
+        app.show_frame("Editor")
+        app.update()
+        report["rss_start_mb"] = _rss_mb()
+
+        def phase(name, fn):
+            """Ошибка в фазе (у старых версий бывают) пишется в отчёт, остальные фазы идут дальше."""
+            rss0 = _rss_mb()
+            t = time.perf_counter()
+            try:
+                res = fn() or {}
+            except Exception as e:
+                res = {"error": f"{type(e).__name__}: {e}"}
+            res["s"] = time.perf_counter() - t
+            rss1 = _rss_mb()
+            res["rss_mb"] = rss1
+            res["rss_delta_mb"] = rss1 - rss0 if rss0 is not None else None
+            report["phases"][name] = res
+
+        def draw():
+            r = replay(ed, synthetic_macro(strokes, points, seed), None, app.update)
+            ms = r["handler_ms"]
+            return {"shapes": r["shapes"], "press_ms": ms["press"], "drag_ms": ms["drag"],
+                    "release_ms": ms["release"]}
+
+        def stack(op):
+            def run():
+                times = []
+                for _ in range(max(1, strokes // 2)):
+                    t = time.perf_counter()
+                    op()
+                    app.update()
+                    times.append((time.perf_counter() - t) * 1000)
+                return {"ms": summarize(times), "shapes": len(ed.shapes)}
+            return run
+
+        def fill():
+            # от щелчка до наложенной заливки: replay ждёт пул после каждого щелчка
+            r = replay(ed, fill_macro(fills, seed), None, app.update)
+            return {"ms": r["fill_ms"]}
+
+        def redraw():
+            times = []
+            for _ in range(3):
+                t = time.perf_counter()
+                ed.redraw_all()
+                app.update_idletasks()
+                times.append((time.perf_counter() - t) * 1000)
+            return {"ms": summarize(times)}
+
+        def export():
+            path = os.path.join(tmp, "out.png")
+            with _Dialogs(path) as d:
+                ed.export_as()
+                drain(app)
+            if d.errors:
+                return {"error": d.errors[0]}
+            return {"bytes": os.path.getsize(path) if os.path.exists(path) else None}
+
+        phase("draw", draw)
+        phase("undo", stack(ed.undo))
+        phase("redo", stack(ed.redo))
+        if supports_fill(mod):
+            phase("fill", fill)
+        phase("redraw", redraw)
+        if hasattr(ed, "export_as"):
+            phase("export", export)
+    finally:
+        app.destroy()
+        shutil.rmtree(tmp, ignore_errors=True)
+    return report
+
+
+def version_of(script):
+    m = re.search(r"v(\d+(?:\.\d+)*)", os.path.basename(script))
+    return m.group(1) if m else os.path.basename(script)
+
+
+def _version_key(script):
+    return tuple(int(p) for p in version_of(script).split(".") if p.isdigit())
+
+
+def find_scripts(patterns=None):
+    """Скрипты версий по маскам (по умолчанию "main v*.py" в текущем каталоге), по возрастанию версии."""
+    files = set()
+    for p in patterns or ["main v*.py"]:
+        files.update(glob.glob(p) if glob.has_magic(p) else [p])
+    return sorted(files, key=_version_key)
+
+
+def run_isolated(script, timeout=600, **params):
+    """run_version в отдельном интерпретаторе: чистый RSS и пустой кэш экспорта (иначе v4.4 берёт из кэша)."""
+    tmp = tempfile.mkdtemp(prefix="gr-versions-")
+    out = os.path.join(tmp, "report.json")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, GRAPHIC_REDACTOR_CACHE=os.path.join(tmp, "cache"),
+               PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")])))
+    cmd = [sys.executable, "-m", "graphic_redactor.versions", os.path.abspath(script), json.dumps(params), out]
+    try:
+        proc = subprocess.run(cmd, env=env, capture_output=True, text=True, timeout=timeout)
+        if proc.returncode == 0 and os.path.exists(out):
+            with open(out, encoding="utf-8") as f:
+                report = json.load(f)
+            report["script"] = script
+            return report
+        err = (proc.stderr.strip().splitlines() or [f"exit {proc.returncode}"])[-1]
+    except subprocess.TimeoutExpired:
+        err = f"timeout {timeout} s"
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return {"script": script, "version": version_of(script), "phases": {}, "error": err}
+
+
+def _cell(res, key="ms"):
+    """p95 из сводки res[key]; key=None — длительность всей фазы в мс."""
+    if res is None:
+        return "-"
+    if "error" in res:
+        return "err"
+    if key is None:
+        return f"{res['s'] * 1000:.0f}"
+    stats = res.get(key) or {}
+    return f"{stats['p95']:.2f}" if stats.get("n") else "-"
+
+
+def table(reports):
+    """Строки таблицы: p95 мс на событие / вызов по фазам, экспорт целиком, RSS в конце прогона."""
+    head = (f"{'version':<8} {'drag p95':>9} {'undo p95':>9} {'redo p95':>9} {'fill p95':>9} "
+            f"{'redraw':>8} {'export':>8} {'RSS MB':>8}")
+    lines = [head, "-" * len(head)]
+    for r in reports:
+        if r.get("skipped") or r.get("error"):
+            lines.append(f"{r['version']:<8} {r.get('skipped') or r.get('error')}")
+            continue
+        ph = r["phases"]
+        rss = [p["rss_mb"] for p in ph.values() if p.get("rss_mb") is not None]
+        lines.append(f"{r['version']:<8} {_cell(ph.get('draw'), 'drag_ms'):>9} {_cell(ph.get('undo')):>9} "
+                     f"{_cell(ph.get('redo')):>9} {_cell(ph.get('fill')):>9} {_cell(ph.get('redraw')):>8} "
+                     f"{_cell(ph.get('export'), None):>8} {(f'{rss[-1]:.0f}' if rss else '-'):>8}")
+    return lines
+
+
+def compare_versions(scripts, timeout=600, log=print, **params):
+    reports = []
+    for script in scripts:
+        if log:
+            log(f"{script} ...")
+        reports.append(run_isolated(script, timeout, **params))
+    return {"params": params, "reports": reports}
+
+
+if __name__ == "__main__":
+    # воркер run_isolated: <скрипт> <параметры JSON> <файл отчёта>
+    _script, _params, _out = sys.argv[1:4]
+    _report = run_version(_script, **json.loads(_params))
+    with open(_out, "w", encoding="utf-8") as _f:
+        json.dump(_report, _f, ensure_ascii=False)
@@ -0,0 +1,183 @@
+"""Общий пул процессов для тяжёлой работы с пикселями (маска заливки, экспорт, миниатюры).
+
+Пул принадлежит App и стартует при первой задаче. Результаты возвращаются в цикл Tk:
+futures опрашиваются через after, колбэки вызываются в потоке GUI. Образы между процессами
+идут через multiprocessing.shared_memory (SharedImage) — pickle несёт только имя буфера и размер.
+"""
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from . import projects
+from .cache import cached_export
+from .document import Document
+from .profiling import TRACER
+
+
+class SharedImage:
+    """PIL-образ в shared_memory. put() — в процессе-отправителе, get() — в получателе.
+    Буфер удаляет (unlink) тот, кто забирает образ последним."""
+    __slots__ = ("name", "mode", "size", "nbytes")
+
+    def __init__(self, name, mode, size, nbytes):
+        self.name, self.mode, self.size, self.nbytes = name, mode, size, nbytes
+
+    @classmethod
+    def put(cls, img):
+        """Копирует пиксели в новый буфер; возвращает (SharedImage, SharedMemory) — буфер держит вызывающий."""
+        data = img.tobytes()
+        shm = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+        shm.buf[:len(data)] = data
+        return cls(shm.name, img.mode, img.size, len(data)), shm
+
+    def get(self, unlink=False):
+        from PIL import Image
+        shm = shared_memory.SharedMemory(name=self.name)
+        view = shm.buf[:self.nbytes]
+        try:
+            return Image.frombytes(self.mode, self.size, view)  # одна копия: буфер -> образ
+        finally:
+            view.release()
+            shm.close()
+            if unlink:
+                shm.unlink()
+
+
+def release(shm):
+    try:
+        shm.close()
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+# ---------- Задачи (выполняются в воркере) ----------
+def fill_job(w, h, shapes, sx, sy, color):
+    """Маска заливки по контурам shapes -> (SharedImage маски, box, этапы ms) или None."""
+    doc = Document(w, h)
+    doc.shapes = shapes
+    res = doc.fill_mask(sx, sy, color)
+    if res is None:
+        return None
+    mask, box = res
+    shared, shm = SharedImage.put(mask)
+    shm.close()  # буфер живёт до unlink в GUI-процессе
+    return shared, box, doc.last_fill_ms
+
+
+def export_job(data, raster, path, aa, aa_filter):
+    """Экспорт документа (фигуры — в data, растровый слой — в shared memory) -> взят ли из кэша."""
+    doc = Document().load_dict(data)
+    if raster is not None:
+        doc.raster_img = raster.get()
+    return cached_export(doc, path, aa=aa, aa_filter=aa_filter)[1]
+
+
+def _snapshot(doc):
+    """Фигуры и meta для передачи в воркер — копия, т.к. pickle происходит позже в другом потоке."""
+    return {"meta": {"w": doc.canvas_w, "h": doc.canvas_h, "bg": doc.background},
+            "shapes": [dict(s, coords=list(s["coords"])) for s in doc.shapes]}
+
+
+def _release_result(result):
+    for item in result if isinstance(result, tuple) else (result,):
+        if isinstance(item, SharedImage):
+            try:
+                release(shared_memory.SharedMemory(name=item.name))
+            except FileNotFoundError:
+                pass
+
+
+class WorkerPool:
+    def __init__(self, widget, max_workers=None, poll_ms=20):
+        self.widget = widget
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.poll_ms = poll_ms
+        self._pool = None
+        self._jobs = {}   # future -> (on_done, on_error, буферы shared memory, имя, время постановки)
+        self._poll_job = None
+
+    @property
+    def busy(self):
+        return len(self._jobs)
+
+    def submit(self, fn, *args, on_done=None, on_error=None, buffers=()):
+        """fn(*args) в воркере; on_done(result) / on_error(exc) — в цикле Tk.
+        buffers — SharedMemory аргументов: освобождаются, когда задача закончилась.
+        В трассу задача попадает спаном pool.<fn> от постановки до конца колбэка."""
+        if self._pool is None:
+            if os.name == "posix":
+                # один трекер на GUI и воркеры: иначе трекер воркера при выходе «чистит»
+                # буферы, которые уже освободил GUI-процесс (и ругается на утечки)
+                from multiprocessing import resource_tracker
+                resource_tracker.ensure_running()
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        fut = self._pool.submit(fn, *args)
+        self._jobs[fut] = (on_done, on_error, buffers, fn.__name__, time.perf_counter())
+        if self._poll_job is None:
+            self._poll_job = self.widget.after(self.poll_ms, self._poll)
+        return fut
+
+    def _poll(self):
+        self._poll_job = None
+        for fut in [f for f in self._jobs if f.done()]:
+            on_done, on_error, buffers, name, t_submit = self._jobs.pop(fut)
+            for shm in buffers:
+                release(shm)
+            if fut.cancelled():
+                continue
+            exc = fut.exception()
+            try:
+                if exc is not None:
+                    if on_error:
+                        on_error(exc)
+                elif on_done:
+                    on_done(fut.result())
+            except Exception:
+                traceback.print_exc()  # ошибка колбэка не должна останавливать опрос
+            TRACER.complete(f"pool.{name}", t_submit, time.perf_counter(),
+                            {"error": repr(exc)} if exc is not None else None)
+        if self._jobs:
+            self._poll_job = self.widget.after(self.poll_ms, self._poll)
+
+    def shutdown(self):
+        if self._poll_job is not None:
+            self.widget.after_cancel(self._poll_job)
+            self._poll_job = None
+        for fut, (_, _, buffers, _, _) in self._jobs.items():
+            for shm in buffers:
+                release(shm)
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                _release_result(fut.result())  # маска, которую уже никто не заберёт
+        self._jobs.clear()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    # ---------- Типизированные задачи ----------
+    def fill_mask(self, doc, sx, sy, color, on_done, on_error=None):
+        """Маска заливки в воркере. on_done(None | (mask: PIL "1", box, этапы ms))."""
+        def done(res):
+            if res is None:
+                on_done(None)
+                return
+            shared, box, stages = res
+            on_done((shared.get(unlink=True), box, stages))
+
+        return self.submit(fill_job, int(doc.canvas_w), int(doc.canvas_h), _snapshot(doc)["shapes"],
+                           int(sx), int(sy), color, on_done=done, on_error=on_error)
+
+    def export(self, doc, path, aa=1, aa_filter="lanczos", on_done=None, on_error=None):
+        """Экспорт в воркере (через кэш экспорта). on_done(hit: bool)."""
+        raster, buffers = None, ()
+        if doc.raster_img is not None:
+            raster, shm = SharedImage.put(doc.raster_img)
+            buffers = (shm,)
+        return self.submit(export_job, _snapshot(doc), raster, path, aa, aa_filter,
+                           on_done=on_done, on_error=on_error, buffers=buffers)
+
+    def thumbnail(self, path, on_done, on_error=None):
+        """Сведения о проекте и миниатюра в кэше. on_done({path, w, h, shapes, thumb} | {path, error})."""
+        return self.submit(projects.project_info, path, on_done=on_done, on_error=on_error)
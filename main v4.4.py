@@ -1,13 +1,34 @@
-import json
+import time
+_T_START = time.perf_counter()  # для --profile-startup
+
+import os
+import sys
 import tkinter as tk
+from collections import deque
 from tkinter import ttk, filedialog, colorchooser, messagebox, simpledialog
 
-# Pillow: для bucket-fill и экспорта
-try:
-    from PIL import Image, ImageDraw, ImageColor, ImageTk
-    PIL_AVAILABLE = True
-except Exception:
-    PIL_AVAILABLE = False
+from graphic_redactor import PIL_AVAILABLE, Document, pen_stroke, projects, render_region, shape_bbox
+from graphic_redactor.idle import LOW, IdleScheduler, run_to_end
+from graphic_redactor.macro import MacroRecorder
+from graphic_redactor.memory import TraceSnapshots, breakdown, format_breakdown
+from graphic_redactor.profiling import TRACER, Profiler, traced
+from graphic_redactor.telemetry import TELEMETRY
+from graphic_redactor.workers import WorkerPool
+
+# Pillow (для bucket-fill, тайлов и экспорта) импортируется при первом использовании — не на старте
+
+
+def _doc_attr(name):
+    """Свойство Editor, которое читает и пишет атрибут self.doc."""
+    return property(lambda self: getattr(self.doc, name), lambda self, v: setattr(self.doc, name, v))
+
+
+def photo_paste(photo, im, box):
+    """Обновляет на месте прямоугольник box=(x0, y0, x1, y1) PhotoImage из im того же размера.
+    В Tk кодируется и копируется только этот прямоугольник, а не весь битмап."""
+    from PIL import ImageTk
+    part = ImageTk.PhotoImage(im.crop(box))
+    photo.tk.call(str(photo), "copy", str(part), "-to", box[0], box[1], "-compositingrule", "set")
 
 
 class App(tk.Tk):
@@ -38,20 +59,34 @@ class App(tk.Tk):
         self.container.grid_rowconfigure(0, weight=1)
         self.container.grid_columnconfigure(0, weight=1)
 
+        # Фреймы строятся при первом показе: Editor (холст, меню, привязки) — не на старте
         self.frames = {}
-        for F in (MainMenu, Editor):
-            frame = F(self.container, self)
-            self.frames[F.__name__] = frame
-            frame.grid(row=0, column=0, sticky="nsew")
+        self.build_ms = {}  # имя фрейма -> время построения, для --profile-startup
+        # Общий пул процессов (маски заливки, экспорт, миниатюры); процессы — при первой задаче
+        self.pool = WorkerPool(self)
 
         self.config(menu="")
         self.show_frame("MainMenu")
 
+    def destroy(self):
+        self.pool.shutdown()
+        super().destroy()
+
+    def get_frame(self, name):
+        frame = self.frames.get(name)
+        if frame is None:
+            t0 = time.perf_counter()
+            frame = {"MainMenu": MainMenu, "Editor": Editor}[name](self.container, self)
+            frame.grid(row=0, column=0, sticky="nsew")
+            self.frames[name] = frame
+            self.build_ms[name] = (time.perf_counter() - t0) * 1000
+        return frame
+
     def show_frame(self, name):
-        frame = self.frames[name]
+        frame = self.get_frame(name)
         frame.tkraise()
         if name == "Editor":
-            editor = self.frames["Editor"]
+            editor = frame
             try:
                 self.config(menu=editor.menubar)
             except Exception:
@@ -59,9 +94,10 @@ class App(tk.Tk):
             editor.focus_canvas()
         else:
             self.config(menu="")
-            main: MainMenu = self.frames["MainMenu"]
-            editor: "Editor" = self.frames["Editor"]
-            main.update_start_button(is_dirty=editor.has_content())
+            main: MainMenu = frame
+            editor = self.frames.get("Editor")
+            main.update_start_button(is_dirty=editor is not None and editor.has_content())
+            main.refresh_recent()
 
 
 class MainMenu(ttk.Frame):
@@ -94,17 +130,75 @@ class MainMenu(ttk.Frame):
         ttk.Button(btns, text="Жобаны ашу", command=self.open_project).grid(row=0, column=1, padx=8, pady=6, ipadx=12, ipady=8, sticky="ew")
         ttk.Button(btns, text="Шығу", command=self.app.destroy).grid(row=0, column=2, padx=8, pady=6, ipadx=12, ipady=8, sticky="ew")
 
+        # Недавние проекты: миниатюры рисуются в общем пуле процессов App
+        self.recent_box = ttk.LabelFrame(wrapper, text="Соңғы жобалар", padding=10)
+        self.recent_box.grid(row=3, column=0, pady=(24, 0))
+        self._thumb_jobs = []    # futures текущего набора карточек
+        self._thumb_images = []  # ссылки на PhotoImage, иначе Tk их выбросит
+        # миниатюры пересохранённых / выпавших из списка файлов — один раз за запуск, после первого кадра
+        self.after_idle(lambda: projects.prune_thumbs(projects.load_recent()))
+
     def update_start_button(self, is_dirty: bool):
         self.btn_start.config(text="Жалғастыру" if is_dirty else "Жаңа жоба")
 
     def new_project(self):
-        ed: "Editor" = self.app.frames["Editor"]
+        ed: "Editor" = self.app.get_frame("Editor")
         if not ed.new_canvas_dialog():  # если нажал Cancel — не открываем редактор
             return
         self.app.show_frame("Editor")
 
-    def open_project(self):
-        editor: "Editor" = self.app.frames["Editor"]
+    # ---------- Недавние проекты ----------
+    def refresh_recent(self):
+        """Перестраивает панель; кэшированные сведения — сразу, остальное — из воркеров."""
+        for w in self.recent_box.winfo_children():
+            w.destroy()
+        self._thumb_images.clear()
+        for fut in self._thumb_jobs:
+            fut.cancel()  # ещё не начатые — карточек уже нет
+        self._thumb_jobs.clear()
+        paths = projects.load_recent()
+        if not paths:
+            ttk.Label(self.recent_box, text="Әзірге жоқ").grid(row=0, column=0)
+            return
+        for col, path in enumerate(paths):
+            card = ttk.Frame(self.recent_box, padding=4, cursor="hand2")
+            card.path = path
+            card.grid(row=0, column=col, padx=6, sticky="n")
+            card.thumb = ttk.Label(card, text="…", anchor="center", width=20)
+            card.thumb.pack()
+            card.caption = ttk.Label(card, text=os.path.basename(path), justify="center")
+            card.caption.pack(pady=(4, 0))
+            for w in (card, card.thumb, card.caption):
+                w.bind("<Button-1>", lambda e, p=path: self.open_project(p))
+            info = projects.cached_info(path)
+            if info:
+                self._show_info(card, info)
+            else:
+                self._thumb_jobs.append(self.app.pool.thumbnail(
+                    path, on_done=lambda info, c=card: self._thumb_ready(c, info),
+                    # воркер упал / кэш недоступен для записи
+                    on_error=lambda e, c=card: self._thumb_ready(c, {"path": c.path, "error": str(e)})))
+
+    def _thumb_ready(self, card, info):
+        if card.winfo_exists():
+            self._show_info(card, info)
+
+    def _show_info(self, card, info):
+        name = os.path.basename(info["path"])
+        if "error" in info:
+            card.thumb.config(text="?")
+            card.caption.config(text=f"{name}\nоқу мүмкін емес")
+            return
+        try:
+            img = tk.PhotoImage(file=info["thumb"])
+            self._thumb_images.append(img)
+            card.thumb.config(image=img, text="", width=0)
+        except tk.TclError:
+            pass
+        card.caption.config(text=f"{name}\n{info['w']}×{info['h']}, {info['shapes']} фигура")
+
+    def open_project(self, path=None):
+        editor: "Editor" = self.app.get_frame("Editor")
         if editor.has_content():
             res = messagebox.askyesnocancel(
                 "Ашу",
@@ -115,7 +209,8 @@ class MainMenu(ttk.Frame):
             if res is False:
                 if not editor.menu_save():
                     return
-        path = filedialog.askopenfilename(filetypes=[("Project JSON", "*.json")])
+        if path is None:
+            path = filedialog.askopenfilename(filetypes=[("Project JSON", "*.json")])
         if not path:
             return
         try:
@@ -126,14 +221,19 @@ class MainMenu(ttk.Frame):
 
 
 class Editor(ttk.Frame):
+    # Состояние документа живёт в self.doc (graphic_redactor.Document); Editor — его Tk-представление
+    canvas_w = _doc_attr("canvas_w")
+    canvas_h = _doc_attr("canvas_h")
+    background = _doc_attr("background")
+    shapes = _doc_attr("shapes")
+    raster_img = _doc_attr("raster_img")
+
     def __init__(self, parent, app):
         super().__init__(parent)
         self.app = app
 
-        # Логический размер холста (для прокрутки/экспорта)
-        self.canvas_w = 1280
-        self.canvas_h = 720
-        self.background = "#ffffff"
+        # Документ: логический размер холста, фигуры, растровый слой, история
+        self.doc = Document(1280, 720, "#ffffff")
 
         # Состояние
         self.current_tool = tk.StringVar(value="line")
@@ -143,17 +243,71 @@ class Editor(ttk.Frame):
         self._start = None
         self._preview_item = None
 
-        # Данные фигур
-        self.shapes = []            # [{type, coords, stroke, width, fill}]
-        self._undo_stack = []       # старая логика — оставлена
+        # Коалесцирование мыши: события копятся, на холст применяются раз в кадр через after
+        self.frame_hz = tk.IntVar(value=60)   # 0 — без ограничения (каждое событие)
+        self._pen_points = []                 # все сэмплы текущего штриха пера
+        self._pending_drag = None             # последнее (x, y, state) для предпросмотра
+        self._pending_status = None
+        self._frame_job = None
+        # Отложенная работа (запекание тайлов, миниатюры недавних, сброс телеметрии) —
+        # когда ввод затих и очередь событий пуста
+        self.idle = IdleScheduler(self)
+        self._fills = deque()  # заливки, ждущие маску из пула процессов, в порядке щелчков
+        self._last_frame = 0.0
+
+        # Качество предпросмотра: "full", "fast" (без сглаживания и заливки) или "auto" — по времени кадра
+        self.preview_quality = tk.StringVar(value="auto")
+        self.preview_budget_ms = 12.0         # дороже этого кадр -> auto переходит на дешёвый предпросмотр
+        self._frame_ms = 0.0                  # сглаженное время кадра при перетаскивании
+        self._auto_cheap = False
+        self._preview_cheap = False
+
+        # Счётчики производительности (всегда включены, дёшевы); показываются HUD в режиме F12
+        self._input_t = None                  # когда пришло самое раннее ещё не отрисованное движение
+        self._latency_ms = deque(maxlen=120)  # ввод -> кадр на холсте, последние кадры
+        self._redraw_ms = 0.0
+        self._fill_ms = {}                    # этапы последней заливки: scene, mask, composite, upload
+        self._mem_memo = (None, 0)            # (ключ состояния истории, байты) — не пересчитывать каждый тик
+
+        # Упрощение штрихов пера при фиксации (RDP), px; 0 — хранить все сэмплы
+        self.simplify_tol = 0.75
+        # Хранить штрихи пера кривыми Безье (тип "bezier"), если так компактнее
+        self.curve_fit = tk.BooleanVar(value=False)
+
+        # Tk-представление фигур
         self._item_to_index = {}    # canvas item_id -> index
         self._dirty = False
 
-        # Растровый слой для bucket-fill (под фигурами)
-        self.raster_img = None      # PIL.Image RGBA в логическом размере
+        # Растровый слой для bucket-fill (под фигурами): PIL-образ в self.doc, здесь — Tk
         self.raster_tk = None
         self.raster_item = None
 
+        # Растрлау (baking): старые фигуры запекаются в тайлы, когда живых Tk-объектов слишком много
+        self.bake_enabled = tk.BooleanVar(value=PIL_AVAILABLE)
+        self.bake_threshold = 20000  # макс. число живых векторных объектов на холсте
+        self.bake_tile = 512         # сторона тайла, px
+        self._baked = set()          # индексы фигур, запечённых в тайлы
+        self._bake_grid = {}         # (tx, ty) -> set(индексы запечённых фигур)
+        self._bake_tiles = {}        # (tx, ty) -> {"img": PIL RGBA, "tk": PhotoImage, "item": id}
+        self._bake_dirty = set()     # тайлы, которые надо перерисовать
+        self._bake_retire = []       # Tk-объекты запечённых фигур: удаляются, когда их тайлы готовы
+        self.bake_batch = 200        # фигур за шаг отложенного запекания
+        # Режим отрисовки: "items" — Tk-объект на фигуру, "backbuffer" — весь кадр в PIL-тайлах
+        self.render_mode = tk.StringVar(value="items")
+        # Сглаживание экспорта: рендер в N раз крупнее и уменьшение (1 — как на холсте)
+        self.export_aa = tk.IntVar(value=1)
+
+        # Профилирование: спаны операций в JSONL-трассу и cProfile выбранного взаимодействия
+        self.trace_on = tk.BooleanVar(value=TRACER.enabled)
+        self.cprofile_on = tk.BooleanVar(value=False)
+        self._profiler = Profiler()
+        # Запись макроса ввода (воспроизведение: python -m graphic_redactor replay)
+        self.macro_on = tk.BooleanVar(value=False)
+        self._macro = MacroRecorder()
+        self._mem_snaps = TraceSnapshots()
+        self.telemetry_on = tk.BooleanVar(value=TELEMETRY.enabled)
+        self.current_tool.trace_add("write", lambda *a: self._macro.record("tool", tool=self.current_tool.get()))
+
         # Меню
         self.menubar = tk.Menu(self.app)
         file_menu = tk.Menu(self.menubar, tearoff=0)
@@ -163,6 +317,8 @@ class Editor(ttk.Frame):
         file_menu.add_command(label="Сақтау...", command=self.menu_save)
         file_menu.add_separator()
         file_menu.add_command(label="Экспортировать как...", command=self.export_as)
+        for aa, lbl in ((1, "жоқ"), (2, "2×"), (3, "3×"), (4, "4×")):
+            file_menu.add_radiobutton(label=f"Экспорт тегістеу: {lbl}", value=aa, variable=self.export_aa)
         file_menu.add_separator()
         file_menu.add_command(label="Басты меню", command=lambda: self.app.show_frame("MainMenu"))
         file_menu.add_command(label="Шығу", command=self.app.destroy)
@@ -179,6 +335,36 @@ class Editor(ttk.Frame):
             tool_menu.add_radiobutton(label=label_map[tool], value=tool, variable=self.current_tool)
         self.menubar.add_cascade(label="Құралдар", menu=tool_menu)
 
+        perf_menu = tk.Menu(self.menubar, tearoff=0)
+        perf_menu.add_checkbutton(label="Ескі фигураларды растрлау", variable=self.bake_enabled,
+                                  command=self.toggle_bake)
+        perf_menu.add_command(label="Растрлау шегі...", command=self.ask_bake_threshold)
+        perf_menu.add_separator()
+        perf_menu.add_radiobutton(label="Сызу: Tk объектілері", value="items",
+                                  variable=self.render_mode, command=self.set_render_mode)
+        perf_menu.add_radiobutton(label="Сызу: PIL буфері", value="backbuffer",
+                                  variable=self.render_mode, command=self.set_render_mode)
+        perf_menu.add_separator()
+        for hz, lbl in ((30, "30 Гц"), (60, "60 Гц"), (120, "120 Гц"), (0, "шектеусіз")):
+            perf_menu.add_radiobutton(label=f"Кадр жиілігі: {lbl}", value=hz, variable=self.frame_hz)
+        perf_menu.add_separator()
+        perf_menu.add_command(label="Қалам штрихын жеңілдету шегі...", command=self.ask_simplify_tol)
+        perf_menu.add_checkbutton(label="Қалам штрихын Безье қисықтарымен сақтау", variable=self.curve_fit)
+        perf_menu.add_command(label="Құжатты оңтайландыру", command=self.optimize_document)
+        perf_menu.add_separator()
+        perf_menu.add_checkbutton(label="Трассаны жазу (JSONL)", variable=self.trace_on, command=self.toggle_trace)
+        perf_menu.add_checkbutton(label="cProfile жазу", variable=self.cprofile_on, command=self.toggle_cprofile)
+        perf_menu.add_checkbutton(label="Макрос жазу", variable=self.macro_on, command=self.toggle_macro)
+        perf_menu.add_command(label="Жад есебі", command=self.memory_report)
+        perf_menu.add_command(label="tracemalloc суреті", command=self.memory_snapshot)
+        perf_menu.add_command(label="tracemalloc тоқтату", command=self.memory_trace_stop)
+        perf_menu.add_checkbutton(label="Жергілікті телеметрия", variable=self.telemetry_on,
+                                  command=lambda: TELEMETRY.set_enabled(self.telemetry_on.get()))
+        perf_menu.add_separator()
+        for q, lbl in (("auto", "авто"), ("full", "толық"), ("fast", "жылдам")):
+            perf_menu.add_radiobutton(label=f"Алдын ала көрініс: {lbl}", value=q, variable=self.preview_quality)
+        self.menubar.add_cascade(label="Өнімділік", menu=perf_menu)
+
         # UI
         self.create_topbar()
         self.create_body()
@@ -199,6 +385,10 @@ class Editor(ttk.Frame):
         self._dbg_items = []
         self._dbg_mask_item = None
         self._dbg_mask_tk = None
+        self._dbg_mask_img = None   # постоянный RGBA-оверлей маски
+        self._dbg_mask_box = None   # где оверлей сейчас закрашен
+        self._hud = None            # Label поверх холста
+        self._hud_job = None
 
         # горячая клавиша
         self.app.bind_all("<F12>", lambda e: self.toggle_debug())
@@ -285,7 +475,7 @@ class Editor(ttk.Frame):
     # ---------- Helpers ----------
     def focus_canvas(self): self.canvas.focus_set()
     def status(self, text): self.status_lbl.config(text=text)
-    def has_content(self) -> bool: return len(self.shapes) > 0 or self.raster_img is not None
+    def has_content(self) -> bool: return self.doc.has_content()
     def mark_dirty(self, v=True): self._dirty = v
 
     def apply_scrollregion(self):
@@ -305,15 +495,13 @@ class Editor(ttk.Frame):
             messagebox.showerror("Қате", "Дұрыс мән енгізіңіз.")
             return False
 
-        self.canvas_w, self.canvas_h, self.background = int(w), int(h), bg
         # очистка
         self.canvas.delete("all")
-        self.shapes.clear()
-        self._undo_stack.clear()
+        self.doc.reset(int(w), int(h), bg)
         self._item_to_index.clear()
-        self.raster_img = None
         self.raster_tk = None
         self.raster_item = None
+        self._reset_bake()
         self.apply_scrollregion()
         self.mark_dirty(False)
         self.status("Жаңа холст жасалды")
@@ -360,24 +548,24 @@ class Editor(ttk.Frame):
                     return
         # просто очистка в текущем размере
         self.canvas.delete("all")
-        self.shapes.clear()
-        self._undo_stack.clear()
+        self.doc.reset()
         self._item_to_index.clear()
-        self.raster_img = None
         self.raster_tk = None
         self.raster_item = None
+        self._reset_bake()
         self.mark_dirty(False)
         self.status("Тазартылды")
 
+    @traced()
     def menu_save(self):
         path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("Project JSON", "*.json")])
         if not path:
             return False
         try:
-            data = {"meta": {"w": self.canvas_w, "h": self.canvas_h, "bg": self.background},
-                    "shapes": self.shapes}
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            t0 = time.perf_counter()
+            self.doc.save(path)
+            self._telemetry("save", t0, bytes=os.path.getsize(path))
+            self._remember(path)
             self.mark_dirty(False)
             self.status("Сақталды")
             return True
@@ -399,122 +587,218 @@ class Editor(ttk.Frame):
         if path:
             self.load_project(path)
 
+    @traced()
     def load_project(self, path):
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if isinstance(data, list):
-            self.shapes = data
-        else:
-            meta = data.get("meta", {})
-            self.canvas_w = int(meta.get("w", self.canvas_w))
-            self.canvas_h = int(meta.get("h", self.canvas_h))
-            self.background = meta.get("bg", self.background)
-            self.shapes = data.get("shapes", [])
-        self.raster_img = None
+        t0 = time.perf_counter()
+        self.doc.load(path)
+        self._telemetry("open", t0, bytes=os.path.getsize(path))
+        self._remember(path)
         self.raster_tk = None
         self.raster_item = None
+        self._reset_bake()
         self.apply_scrollregion()
         self.mark_dirty(False)
         self.status("Ашылды")
 
+    def _telemetry(self, op, t0, **stats):
+        """Время операции с t0 и размеры документа — в локальный лог, если телеметрия включена.
+        Событие копится в памяти; на диск буфер уходит, когда пользователь замрёт."""
+        if TELEMETRY.enabled:
+            TELEMETRY.record(op, (time.perf_counter() - t0) * 1000, shapes=len(self.shapes),
+                             w=self.canvas_w, h=self.canvas_h, **stats)
+            if TELEMETRY.pending == 1:
+                self.idle.add(TELEMETRY.flush, priority=LOW, key="telemetry")
+
+    def _remember(self, path):
+        try:
+            projects.add_recent(path)
+        except OSError:
+            return  # список недавних — не критично
+        # миниатюра для главного меню — заранее, когда пользователь замрёт (рисует её пул процессов)
+        self.idle.add(self._warm_thumb, os.path.abspath(path), priority=LOW, key=("thumb", path))
+
+    def _warm_thumb(self, path):
+        if os.path.isfile(path) and projects.cached_info(path) is None:
+            self.app.pool.thumbnail(path, on_done=None)
+
     # ---------- Рисование ----------
+    @traced()
     def on_press(self, e):
+        self.idle.note_input()
         tool = self.current_tool.get()
         cx, cy = self.canvas.canvasx(e.x), self.canvas.canvasy(e.y)
+        if self._macro.recording:
+            self._macro.record("press", x=cx, y=cy, state=e.state, tool=tool, width=self.stroke_width.get(),
+                               stroke=self.stroke_color, fill=self.fill_color)
 
         if tool == "fill":
             self.bucket_fill(int(cx), int(cy))
             return
 
         self._start = (cx, cy)
-        w = self.stroke_width.get()
+        q = self.preview_quality.get()
+        self._preview_cheap = q == "fast" or (q == "auto" and self._auto_cheap)
+        opts = self._preview_opts(tool, self._preview_cheap)
         if tool == "pen":
-            self._preview_item = self.canvas.create_line(cx, cy, cx, cy,
-                                                         fill=self.stroke_color, width=w,
-                                                         capstyle=tk.ROUND, smooth=True)
+            self._pen_points = [cx, cy, cx, cy]
+            self._preview_item = self.canvas.create_line(cx, cy, cx, cy, **opts)
         elif tool == "line":
-            self._preview_item = self.canvas.create_line(cx, cy, cx, cy,
-                                                         fill=self.stroke_color, width=w)
+            self._preview_item = self.canvas.create_line(cx, cy, cx, cy, **opts)
         elif tool == "rect":
-            self._preview_item = self.canvas.create_rectangle(cx, cy, cx, cy,
-                                                              outline=self.stroke_color, width=w,
-                                                              fill=self.fill_color or "")
+            self._preview_item = self.canvas.create_rectangle(cx, cy, cx, cy, **opts)
         elif tool == "oval":
-            self._preview_item = self.canvas.create_oval(cx, cy, cx, cy,
-                                                         outline=self.stroke_color, width=w,
-                                                         fill=self.fill_color or "")
+            self._preview_item = self.canvas.create_oval(cx, cy, cx, cy, **opts)
+
+    def _preview_opts(self, tool, cheap):
+        """Стиль предпросмотра; cheap — без сглаживания, скруглений и заливки (Tk рисует его дешевле)."""
+        w = self.stroke_width.get()
+        if tool == "pen":
+            return dict(fill=self.stroke_color, width=w,
+                        capstyle=tk.BUTT if cheap else tk.ROUND, smooth=not cheap)
+        if tool == "line":
+            return dict(fill=self.stroke_color, width=w)
+        return dict(outline=self.stroke_color, width=w, fill="" if cheap else (self.fill_color or ""))
 
+    @traced()
     def on_drag(self, e):
+        self.idle.note_input()
+        if self._macro.recording:
+            self._macro.record("drag", x=self.canvas.canvasx(e.x), y=self.canvas.canvasy(e.y), state=e.state)
         if not self._start or not self._preview_item: return
         if self.current_tool.get() == "fill": return
-        x0, y0 = self._start
         x1, y1 = self.canvas.canvasx(e.x), self.canvas.canvasy(e.y)
         if self.current_tool.get() == "pen":
-            last = self.canvas.coords(self._preview_item)
-            self.canvas.coords(self._preview_item, *last, x1, y1)
+            # в данные идёт каждый сэмпл, на холст — раз в кадр
+            self._pen_points += (x1, y1)
+        self._pending_drag = (x1, y1, e.state)
+        if self._input_t is None:
+            self._input_t = time.perf_counter()
+        self._pending_status = f"({int(x1)}, {int(y1)})"
+        self._schedule_frame()
+
+    def _apply_drag(self):
+        if self._pending_drag is None or not self._preview_item:
+            return
+        x1, y1, state = self._pending_drag
+        self._pending_drag = None
+        x0, y0 = self._start
+        if self.current_tool.get() == "pen":
+            self.canvas.coords(self._preview_item, *self._pen_points)
         elif self.current_tool.get() == "line":
             self.canvas.coords(self._preview_item, x0, y0, x1, y1)
         else:
-            shift_pressed = (e.state & 0x0001) != 0
+            shift_pressed = (state & 0x0001) != 0
             if shift_pressed:
                 side = max(abs(x1-x0), abs(y1-y0))
                 x1 = x0 + side if x1 >= x0 else x0 - side
                 y1 = y0 + side if y1 >= y0 else y0 - side
             self.canvas.coords(self._preview_item, x0, y0, x1, y1)
-        self.status(f"({int(x1)}, {int(y1)})")
 
+    # ---------- Кадровый темп ----------
+    def _schedule_frame(self):
+        """Применить накопленное движение: сразу, если кадр уже прошёл, иначе — в начале следующего."""
+        if self._frame_job is not None:
+            return
+        hz = self.frame_hz.get()
+        wait = self._last_frame + 1.0 / hz - time.perf_counter() if hz > 0 else 0
+        if wait <= 0:
+            self._flush_frame()
+        else:
+            self._frame_job = self.after(max(1, int(wait * 1000)), self._flush_frame)
+
+    @traced()
+    def _flush_frame(self):
+        if self._frame_job is not None:
+            self.after_cancel(self._frame_job)
+            self._frame_job = None
+        self._last_frame = time.perf_counter()
+        if self._pending_drag is not None:
+            self._apply_drag()
+            # честное время кадра: вместе с перерисовкой холста
+            self.canvas.update_idletasks()
+            now = time.perf_counter()
+            self._track_frame_time((now - self._last_frame) * 1000)
+            if self._input_t is not None:
+                self._latency_ms.append((now - self._input_t) * 1000)
+                self._input_t = None
+        if self._pending_status is not None:
+            self.status(self._pending_status)
+            self._pending_status = None
+
+    def _track_frame_time(self, ms):
+        """Сглаженное время кадра; в режиме auto переключает дешёвый предпросмотр (с гистерезисом)."""
+        self._frame_ms = ms if not self._frame_ms else self._frame_ms * 0.8 + ms * 0.2
+        if self._frame_ms > self.preview_budget_ms:
+            self._auto_cheap = True
+        elif self._frame_ms < self.preview_budget_ms / 2:
+            self._auto_cheap = False
+        if (self.preview_quality.get() == "auto" and self._auto_cheap
+                and not self._preview_cheap and self._preview_item):
+            self._preview_cheap = True
+            self.canvas.itemconfig(self._preview_item, **self._preview_opts(self.current_tool.get(), True))
+
+    @traced()
     def on_release(self, e):
+        if self._macro.recording:
+            self._macro.record("release", x=self.canvas.canvasx(e.x), y=self.canvas.canvasy(e.y), state=e.state)
         if self.current_tool.get() == "fill": return
         if not self._start or not self._preview_item: return
+        self._flush_frame()
+        if self._preview_cheap:
+            # финальный стиль — один раз, при фиксации
+            self.canvas.itemconfig(self._preview_item, **self._preview_opts(self.current_tool.get(), False))
+            self._preview_cheap = False
         x0, y0 = self._start
         x1, y1 = self.canvas.canvasx(e.x), self.canvas.canvasy(e.y)
         tool = self.current_tool.get()
         w = self.stroke_width.get(); stroke = self.stroke_color
         fill = self.fill_color if tool in ("rect","oval") and self.fill_color else ""
         if tool == "pen":
-            coords = self.canvas.coords(self._preview_item)
-            idx = len(self.shapes)
-            self.shapes.append({"type":"pen","coords":coords,"stroke":stroke,"width":w,"fill":""})
+            t, coords = pen_stroke(self._pen_points, self.simplify_tol, self.curve_fit.get())
+            self._pen_points = []
+            self.canvas.coords(self._preview_item, *coords)
+            # после упрощения вершины редкие: сплайн Tk ушёл бы от ломаной, которую рисует экспорт
+            self.canvas.itemconfig(self._preview_item, smooth="raw" if t == "bezier" else False)
+            shape = {"type":t,"coords":coords,"stroke":stroke,"width":w,"fill":""}
+            if self.simplify_tol > 0:
+                shape["tol"] = self.simplify_tol  # уже упрощён: «Құжатты оңтайландыру» не пройдёт по нему снова
+            idx = self.doc.add_shape(shape)
             self._item_to_index[self._preview_item] = idx
         elif tool == "line":
             coords = [x0,y0,x1,y1]
             self.canvas.coords(self._preview_item, *coords)
-            idx = len(self.shapes)
-            self.shapes.append({"type":"line","coords":coords,"stroke":stroke,"width":w,"fill":""})
+            idx = self.doc.add_shape({"type":"line","coords":coords,"stroke":stroke,"width":w,"fill":""})
             self._item_to_index[self._preview_item] = idx
         elif tool == "rect":
             coords = self.canvas.coords(self._preview_item)
-            idx = len(self.shapes)
-            self.shapes.append({"type":"rect","coords":coords,"stroke":stroke,"width":w,"fill":fill})
+            idx = self.doc.add_shape({"type":"rect","coords":coords,"stroke":stroke,"width":w,"fill":fill})
             self._item_to_index[self._preview_item] = idx
         elif tool == "oval":
             coords = self.canvas.coords(self._preview_item)
-            idx = len(self.shapes)
-            self.shapes.append({"type":"oval","coords":coords,"stroke":stroke,"width":w,"fill":fill})
+            idx = self.doc.add_shape({"type":"oval","coords":coords,"stroke":stroke,"width":w,"fill":fill})
             self._item_to_index[self._preview_item] = idx
         self._start = None
         self._preview_item = None
-        self._undo_stack.clear()
         self.mark_dirty(True)
         self.status("Сызылды")
-        # держим растровый слой под всеми фигурами
-        if hasattr(self, "raster_item") and self.raster_item:
-            try:
-                self.canvas.tag_lower(self.raster_item)
-            except Exception:
-                pass
+        # слишком много живых объектов — старые уходят в тайлы (в backbuffer — сразу все);
+        # не в обработчике отпускания, а когда пользователь замрёт
+        self.idle.add(self._bake_to_budget, priority=LOW, key="bake")
 
     def on_motion(self, e):
         cx, cy = int(self.canvas.canvasx(e.x)), int(self.canvas.canvasy(e.y))
-        self.status(f"Коорд: {cx}, {cy} | Құрал: {self.current_tool.get()}")
+        self._pending_status = f"Коорд: {cx}, {cy} | Құрал: {self.current_tool.get()}"
+        self._schedule_frame()
 
     # ---------- Bucket fill (Құю) ----------
+    @traced()
     def bucket_fill(self, x, y):
         """Заливка области до границы, с поддержкой Қалам, Сызық, Тікбұрыш, Эллипс и отладкой (F12)."""
         if not PIL_AVAILABLE:
             messagebox.showerror("Қате", "Pillow қажет: pip install pillow")
             return
 
+        t_fill = time.perf_counter()
         self._clear_dbg()
         cx, cy = int(self.canvas.canvasx(x)), int(self.canvas.canvasy(y))
         self._dbg("click", cx, cy)
@@ -529,171 +813,393 @@ class Editor(ttk.Frame):
             if bx:
                 self._dbg_point((bx[0] + bx[2]) // 2, (bx[1] + bx[3]) // 2, color="#999", r=2)
 
-        for idx, s in enumerate(self.shapes):
-            t = s["type"]
-            coords = s["coords"]
-
-            if t in ("rect", "oval"):
-                x0, y0, x1, y1 = map(int, coords)
-                if x0 <= cx <= x1 and y0 <= cy <= y1:
-                    s["fill"] = self.fill_color or "#ffffff"
-                    self._dbg("fill figure", t, "idx", idx)
-
-                    # обновляем фигуру напрямую, без полной перерисовки
-                    for item, idx2 in self._item_to_index.items():
-                        if idx2 == idx:
-                            self.canvas.itemconfig(item, fill=s["fill"])
-                            break
-
-                    self.mark_dirty(True)
-                    self.status("Құю қолданылды (фигура)")
-                    return
-
-            if t in ("line", "pen"):
-                pts = [(coords[i], coords[i + 1]) for i in range(0, len(coords), 2)]
-                if len(pts) < 2:
-                    continue
-                best = None
-                for (x1, y1), (x2, y2) in zip(pts, pts[1:]):
-                    dx, dy = x2 - x1, y2 - y1
-                    seglen2 = dx * dx + dy * dy
-                    if seglen2 == 0:
-                        continue
-                    tproj = max(0, min(1, ((cx - x1) * dx + (cy - y1) * dy) / seglen2))
-                    projx = x1 + dx * tproj
-                    projy = y1 + dy * tproj
-                    dist2 = (projx - cx) ** 2 + (projy - cy) ** 2
-                    if best is None or dist2 < best[0]:
-                        best = (dist2, dx, dy, projx, projy)
-
-                if best:
-                    dist2, dx, dy, projx, projy = best
-                    # если курсор слишком далеко (>6 пикселей) — пропускаем
-                    if dist2 > 36:
-                        continue
-
-                    seglen = (dx ** 2 + dy ** 2) ** 0.5
-                    if seglen == 0:
-                        continue
-                    nx, ny = -dy / seglen, dx / seglen
-                    sx, sy = int(projx + nx * 4), int(projy + ny * 4)
-
-                    self._dbg("nearest segment", (projx, projy))
-                    self._dbg_point(projx, projy, color="#ffa500", r=3, text="proj")
-                    self._dbg_point(sx, sy, color="#00c853", r=3, text="+seed")
-                    self._dbg_point(int(projx - nx * 4), int(projy - ny * 4), color="#d50000", r=3, text="-seed")
-
-                    self._fill_raster(sx, sy)
-                    self.mark_dirty(True)
-                    self.status("Құю қолданылды (сызық/қалам)")
-                    return
-
-        self._dbg("bg fill")
-        self._fill_raster(cx, cy)
-        self.mark_dirty(True)
-        self.status("Құю қолданылды (фон)")
-
-    def _fill_raster(self, sx, sy):
-        """Заливает область на растровом слое с заданного seed."""
-        W = max(2, int(self.canvas.winfo_width()))
-        H = max(2, int(self.canvas.winfo_height()))
-
-        scene = Image.new("RGB", (W, H), (255, 255, 255))
-        draw = ImageDraw.Draw(scene)
-        for s in self.shapes:
-            t = s["type"]
-            coords = s["coords"]
-            stroke = s.get("stroke", "#000")
-            width = int(s.get("width", 2))
-            if t == "pen":
-                pts = [(coords[i], coords[i + 1]) for i in range(0, len(coords), 2)]
-                if len(pts) >= 2:
-                    draw.line(pts, fill=stroke, width=width)
-            elif t == "line":
-                x0, y0, x1, y1 = map(int, coords)
-                draw.line([(x0, y0), (x1, y1)], fill=stroke, width=width)
-            elif t == "rect":
-                x0, y0, x1, y1 = map(int, coords)
-                draw.rectangle([x0, y0, x1, y1], outline=stroke, width=width)
-            elif t == "oval":
-                x0, y0, x1, y1 = map(int, coords)
-                draw.ellipse([x0, y0, x1, y1], outline=stroke, width=width)
-
-        fill_rgb = ImageColor.getrgb(self.fill_color)
-        target = scene.getpixel((max(0, min(W - 1, sx)), max(0, min(H - 1, sy))))
-        if target == fill_rgb:
+        res = self.doc.fill_seed(cx, cy, self.fill_color, trace=self._dbg_fill_trace)
+        if res is None:
             return
-
-        mask = Image.new("1", (W, H), 0)
-        spx = scene.load()
-        mpx = mask.load()
-        stack = [(sx, sy)]
-        while stack:
-            px, py = stack.pop()
-            if px < 0 or py < 0 or px >= W or py >= H:
+        if res[0] == "shape":
+            idx = res[1]
+            if idx in self._baked:
+                # фигура в тайлах — перерисовать на месте только тайлы под ней, порядок наложения тот же
+                self._bake_dirty.update(self._tile_keys(shape_bbox(self.shapes[idx])))
+                run_to_end(self._render_bake_tiles())
+            else:
+                # обновляем фигуру напрямую, без полной перерисовки
+                for item, idx2 in self._item_to_index.items():
+                    if idx2 == idx:
+                        self.canvas.itemconfig(item, fill=self.shapes[idx]["fill"])
+                        break
+            self.mark_dirty(True)
+            self._telemetry("fill", t_fill, kind="shape")
+            self.status("Құю қолданылды (фигура)")
+            return
+        # маска считается в пуле процессов, GUI не ждёт; результаты накладываются в порядке щелчков
+        kind, sx, sy = res
+        entry = {"kind": kind, "color": self.fill_color, "t": t_fill, "gen": self.doc.generation,
+                 "ready": False, "res": None, "error": None}
+        self._fills.append(entry)
+        self.app.pool.fill_mask(self.doc, sx, sy, self.fill_color,
+                                on_done=lambda r, e=entry: self._fill_ready(e, r),
+                                on_error=lambda exc, e=entry: self._fill_ready(e, None, exc))
+        self.status("Құю есептелуде…")
+
+    @traced()
+    def _fill_ready(self, entry, res, error=None):
+        entry.update(ready=True, res=res, error=error)
+        while self._fills and self._fills[0]["ready"]:
+            e = self._fills.popleft()
+            if e["gen"] != self.doc.generation:
+                continue  # щелчок был по документу, который уже закрыт (жаңа / ашу)
+            if e["error"] is not None:
+                messagebox.showerror("Қате", f"Құю мүмкін болмады:\n{e['error']}")
                 continue
-            if mpx[px, py] or spx[px, py] != target:
+            if e["res"] is None:
                 continue
-            mpx[px, py] = 1
-            stack.extend([(px + 1, py), (px - 1, py), (px, py + 1), (px, py - 1)])
-
-        # визуализируем маску, если debug включен
-        self._dbg_mask(mask)
-
-        if self.raster_img is None or self.raster_img.size != (W, H):
-            self.raster_img = Image.new("RGBA", (W, H), (0, 0, 0, 0))
-        paint = Image.new("RGBA", (W, H), fill_rgb + (255,))
-        self.raster_img.paste(paint, (0, 0), mask)
-        self.raster_tk = ImageTk.PhotoImage(self.raster_img)
+            mask, box, stages = e["res"]
+            self.doc.last_fill_ms = dict(stages)
+            self.doc.apply_fill(mask, box, e["color"])
+            # визуализируем маску, если debug включен
+            self._dbg_mask(mask)
+            t0 = time.perf_counter()
+            self._show_raster(box)
+            self.canvas.update_idletasks()
+            self._fill_ms = dict(self.doc.last_fill_ms, upload=(time.perf_counter() - t0) * 1000)
+            self.mark_dirty(True)
+            self._telemetry("fill", e["t"], kind=e["kind"])
+            self.status("Құю қолданылды (сызық/қалам)" if e["kind"] == "stroke" else "Құю қолданылды (фон)")
+
+    _DBG_FILL_MARKERS = {"proj": "#ffa500", "+seed": "#00c853", "-seed": "#d50000"}
+
+    def _dbg_fill_trace(self, event, *args):
+        self._dbg(event, *args)
+        color = self._DBG_FILL_MARKERS.get(event)
+        if color:
+            self._dbg_point(args[0], args[1], color=color, r=3, text=event)
+
+    @traced()
+    def _show_raster(self, box):
+        """Обновляет Tk-вид растрового слоя после заливки в области box."""
+        if self._backbuffer():
+            # растровый слой уже внутри тайлов — перекомпоновать только область заливки
+            self.raster_tk = None
+            self._bake_dirty.update(self._tile_keys(box))
+            run_to_end(self._render_bake_tiles())
+            return
+        if self.raster_tk is None or (self.raster_tk.width(), self.raster_tk.height()) != self.raster_img.size:
+            from PIL import ImageTk
+            self.raster_tk = ImageTk.PhotoImage(self.raster_img)
+        else:
+            # PhotoImage постоянный — в Tk уходят только изменённые пиксели
+            photo_paste(self.raster_tk, self.raster_img, box)
         if self.raster_item and self.canvas.type(self.raster_item) == "image":
             self.canvas.itemconfig(self.raster_item, image=self.raster_tk)
         else:
             self.raster_item = self.canvas.create_image(0, 0, image=self.raster_tk, anchor="nw", tags=("__raster__",))
-            self.canvas.tag_lower(self.raster_item)
+        self._restack_layers()
 
     # ---------- Перерисовка ----------
+    @traced()
     def redraw_all(self):
-        self.canvas.delete("all")
-        # фон
-        self.canvas.create_rectangle(0, 0, self.canvas_w, self.canvas_h,
-                                     fill=self.background, outline=self.background, tags=("__bg__",))
+        t0 = time.perf_counter()
+        self._redraw_all()
+        self._redraw_ms = (time.perf_counter() - t0) * 1000
+        self._telemetry("redraw", t0)
 
-        # растровый слой (если был bucket-fill)
-        if self.raster_img is not None:
-            self.raster_tk = ImageTk.PhotoImage(self.raster_img)
-            self.raster_item = self.canvas.create_image(0, 0, image=self.raster_tk, anchor="nw", tags=("__raster__",))
-            self.canvas.tag_lower(self.raster_item)
+    def _redraw_all(self):
+        self.canvas.delete("all")
+        self._item_to_index.clear()
+        for tile in self._bake_tiles.values():
+            tile["item"] = None
+        if self._backbuffer():
+            # фон и растровый слой компонуются прямо в тайлы
+            self.raster_item = None
+            if not self._bake_tiles:
+                self._bake_dirty.update(self._tile_keys((0, 0, self.canvas_w, self.canvas_h)))
+        else:
+            # фон
+            self.canvas.create_rectangle(0, 0, self.canvas_w, self.canvas_h,
+                                         fill=self.background, outline=self.background, tags=("__bg__",))
+
+            # растровый слой (если был bucket-fill)
+            if self.raster_img is not None:
+                # raster_tk всегда синхронен raster_img — пересоздаём только если его нет
+                if self.raster_tk is None:
+                    from PIL import ImageTk
+                    self.raster_tk = ImageTk.PhotoImage(self.raster_img)
+                self.raster_item = self.canvas.create_image(0, 0, image=self.raster_tk, anchor="nw", tags=("__raster__",))
+
+        # старые фигуры — в запечённых тайлах (отложенное запекание уже не нужно)
+        self.idle.cancel("bake")
+        self._bake_retire.clear()  # уже удалены вместе со всем холстом
+        run_to_end(self._bake_to_budget())
+        run_to_end(self._render_bake_tiles())  # image-объекты тайлов — заново после delete("all")
 
         # вектор
-        self._item_to_index.clear()
         for i, s in enumerate(self.shapes):
-            t = s["type"]; w = s.get("width", 2)
-            if t == "pen":
-                item = self.canvas.create_line(*s["coords"], fill=s.get("stroke","#000"),
-                                               width=w, capstyle=tk.ROUND, smooth=True)
-            elif t == "line":
-                item = self.canvas.create_line(*s["coords"], fill=s.get("stroke","#000"), width=w)
-            elif t == "rect":
-                item = self.canvas.create_rectangle(*s["coords"], outline=s.get("stroke","#000"),
-                                                    width=w, fill=s.get("fill",""))
-            elif t == "oval":
-                item = self.canvas.create_oval(*s["coords"], outline=s.get("stroke","#000"),
-                                               width=w, fill=s.get("fill",""))
-            else:
+            if i in self._baked:
+                continue
+            item = self._create_shape_item(s)
+            if item is None:
                 continue
             self._item_to_index[item] = i
+        self._restack_layers()
+
+    def _create_shape_item(self, s):
+        t = s["type"]; w = s.get("width", 2)
+        if t == "pen":
+            return self.canvas.create_line(*s["coords"], fill=s.get("stroke","#000"),
+                                           width=w, capstyle=tk.ROUND, smooth=False)
+        elif t == "bezier":
+            return self.canvas.create_line(*s["coords"], fill=s.get("stroke","#000"),
+                                           width=w, capstyle=tk.ROUND, smooth="raw")
+        elif t == "line":
+            return self.canvas.create_line(*s["coords"], fill=s.get("stroke","#000"), width=w)
+        elif t == "rect":
+            return self.canvas.create_rectangle(*s["coords"], outline=s.get("stroke","#000"),
+                                                width=w, fill=s.get("fill",""))
+        elif t == "oval":
+            return self.canvas.create_oval(*s["coords"], outline=s.get("stroke","#000"),
+                                           width=w, fill=s.get("fill",""))
+        return None
+
+    def _restack_layers(self):
+        """Порядок слоёв: фон -> растровая заливка -> DBG маска -> запечённые тайлы -> вектор.
+        В режиме backbuffer фон и заливка уже в тайлах, маска — над ними."""
+        tags = ("__dbgmask__", "__baked__") if self._backbuffer() else ("__baked__", "__dbgmask__", "__raster__", "__bg__")
+        for tag in tags:
+            self.canvas.tag_lower(tag)
+
+    def _backbuffer(self):
+        return PIL_AVAILABLE and self.render_mode.get() == "backbuffer"
+
+    # ---------- Растрлау (baking) ----------
+    def _reset_bake(self):
+        self.idle.cancel("bake")
+        for item in self._bake_retire:
+            self.canvas.delete(item)
+        self._bake_retire.clear()
+        self._baked.clear()
+        self._bake_grid.clear()
+        self._bake_tiles.clear()
+        self._bake_dirty.clear()
+
+    def _tile_keys(self, bbox):
+        """Тайлы холста, которые задевает bbox."""
+        if bbox is None:
+            return []
+        T = self.bake_tile
+        x0, y0 = max(0, bbox[0]), max(0, bbox[1])
+        x1, y1 = min(self.canvas_w - 1, bbox[2]), min(self.canvas_h - 1, bbox[3])
+        if x0 > x1 or y0 > y1:
+            return []
+        return [(tx, ty) for ty in range(y0 // T, y1 // T + 1) for tx in range(x0 // T, x1 // T + 1)]
+
+    def _bake_to_budget(self):
+        """Генератор: запекает самые старые живые фигуры в тайлы, если их больше bake_threshold
+        (в режиме backbuffer — все). Уступает после каждых bake_batch фигур и каждого тайла.
+        Tk-объекты запечённых фигур живут до перерисовки их тайлов (_bake_retire), поэтому
+        прерванное запекание не оставляет дыр на холсте — его доделает следующий проход."""
+        backbuffer = self._backbuffer()
+        if not backbuffer and not (PIL_AVAILABLE and self.bake_enabled.get()):
+            return
+        limit = 0 if backbuffer else self.bake_threshold
+        live = len(self.shapes) - len(self._baked)
+        if live > limit:
+            # пачкой до 3/4 лимита, чтобы не перерисовывать тайлы на каждом штрихе
+            need = live - limit * 3 // 4
+            index_to_item = {i: item for item, i in self._item_to_index.items()}
+            step = 0
+            for i, s in enumerate(self.shapes):
+                if need <= 0:
+                    break
+                if i in self._baked:
+                    continue
+                self._baked.add(i)
+                for key in self._tile_keys(shape_bbox(s)):
+                    self._bake_grid.setdefault(key, set()).add(i)
+                    self._bake_dirty.add(key)
+                item = index_to_item.get(i)
+                if item is not None and self._item_to_index.pop(item, None) is not None:
+                    self._bake_retire.append(item)
+                need -= 1
+                step += 1
+                if step % self.bake_batch == 0:
+                    yield
+        # и то, что осталось от прерванного прохода
+        yield from self._render_bake_tiles()
+
+    def _forget_baked(self, idx):
+        """Убирает фигуру из тайлов (данные в self.shapes не трогает)."""
+        if idx not in self._baked:
+            return
+        self._baked.discard(idx)
+        for key in self._tile_keys(shape_bbox(self.shapes[idx])):
+            members = self._bake_grid.get(key)
+            if members is not None:
+                members.discard(idx)
+            self._bake_dirty.add(key)
+
+    def _render_bake_tiles(self):
+        """Генератор: перерисовывает грязные тайлы по одному (уступая после каждого), затем создаёт
+        недостающие image-объекты и удаляет Tk-объекты фигур, которые теперь в тайлах."""
+        T = self.bake_tile
+        backbuffer = self._backbuffer()
+        while self._bake_dirty:
+            key = self._bake_dirty.pop()
+            members = self._bake_grid.get(key)
+            tile = self._bake_tiles.get(key)
+            if not members and not backbuffer:
+                self._bake_grid.pop(key, None)
+                if tile:
+                    if tile["item"]:
+                        self.canvas.delete(tile["item"])
+                    del self._bake_tiles[key]
+                continue
+            x0, y0 = key[0] * T, key[1] * T
+            box = (x0, y0, min(x0 + T, self.canvas_w), min(y0 + T, self.canvas_h))
+            if backbuffer:
+                img = render_region(self.shapes, box, self.background, self.raster_img, sorted(members or ()))
+            else:
+                img = render_region(self.shapes, box, indices=sorted(members))
+            if tile is None:
+                tile = self._bake_tiles[key] = {"img": None, "tk": None, "item": None}
+            if tile["tk"] is not None and tile["img"].size == img.size:
+                tile["tk"].paste(img)  # тот же PhotoImage, без нового Tk-образа
+            else:
+                from PIL import ImageTk
+                tile["tk"] = ImageTk.PhotoImage(img)
+                if tile["item"]:
+                    self.canvas.itemconfig(tile["item"], image=tile["tk"])
+            tile["img"] = img
+            yield
+
+        for (tx, ty), tile in self._bake_tiles.items():
+            if tile["item"] is None:
+                tile["item"] = self.canvas.create_image(tx * T, ty * T, image=tile["tk"], anchor="nw",
+                                                        tags=("__baked__",))
+        for item in self._bake_retire:
+            self.canvas.delete(item)
+        self._bake_retire.clear()
+        self._restack_layers()
+
+    def toggle_bake(self):
+        if not PIL_AVAILABLE:
+            self.bake_enabled.set(False)
+            messagebox.showerror("Қате", "Pillow қажет: pip install pillow")
+            return
+        if not self.bake_enabled.get():
+            self._reset_bake()
+        self.redraw_all()
+        self.status(f"Растрлау: {'ON' if self.bake_enabled.get() else 'OFF'}")
+
+    def ask_bake_threshold(self):
+        n = simpledialog.askinteger("Өнімділік", "Холстағы тірі фигуралар шегі:",
+                                    initialvalue=self.bake_threshold, minvalue=100, parent=self)
+        if n is None:
+            return
+        self.bake_threshold = int(n)
+        self.idle.add(self._bake_to_budget, priority=LOW, key="bake")
+
+    def ask_simplify_tol(self):
+        tol = simpledialog.askfloat("Өнімділік", "Қалам штрихын жеңілдету шегі (px, 0 — өшіру):",
+                                    initialvalue=self.simplify_tol, minvalue=0.0, maxvalue=10.0, parent=self)
+        if tol is None:
+            return
+        self.simplify_tol = float(tol)
+
+    def optimize_document(self):
+        """Пакетно упрощает все штрихи пера документа с текущим допуском."""
+        if self.simplify_tol <= 0:
+            self.status("Жеңілдету өшірулі (шегі 0)")
+            return
+        before, after = self.doc.optimize(self.simplify_tol, self.curve_fit.get())
+        if before == after:
+            self.status("Оңтайландыратын ештеңе жоқ")
+            return
+        self._reset_bake()
+        self.redraw_all()
+        self.mark_dirty(True)
+        self.status(f"Оңтайландырылды: {before} → {after} нүкте")
+
+    def toggle_trace(self):
+        if self.trace_on.get():
+            try:
+                path = TRACER.start()
+            except OSError as e:
+                self.trace_on.set(False)
+                messagebox.showerror("Трасса", f"Файлды ашу мүмкін болмады:\n{e}")
+                return
+            self.status(f"Трасса жазылуда: {path}")
+        else:
+            TRACER.stop()
+            self.status(f"Трасса сақталды: {TRACER.path}")
+
+    def toggle_cprofile(self):
+        if self.cprofile_on.get():
+            self._profiler.start()
+            self.status("cProfile: әрекетті орындаңыз, содан кейін қайта басыңыз")
+        else:
+            try:
+                path = self._profiler.stop()
+            except OSError as e:
+                messagebox.showerror("cProfile", f"Сақтау мүмкін болмады:\n{e}")
+                return
+            self.status(f"cProfile сақталды: {path}")
+
+    # ---------- Учёт памяти ----------
+    def memory_report(self):
+        lines = format_breakdown(breakdown(self))
+        messagebox.showinfo("Жад есебі", "\n".join(lines))
+
+    def memory_snapshot(self):
+        """Первый снимок включает tracemalloc; каждый следующий показывает рост с предыдущего."""
+        n = self._mem_snaps.take(time.strftime("%H:%M:%S"))
+        if n == 0:
+            self.status("tracemalloc қосылды: бірінші сурет алынды")
+            return
+        messagebox.showinfo("tracemalloc", "\n".join(self._mem_snaps.diff()))
+
+    def memory_trace_stop(self):
+        self._mem_snaps.stop()
+        self.status("tracemalloc тоқтатылды")
+
+    def toggle_macro(self):
+        if self.macro_on.get():
+            self._macro.start(w=self.canvas_w, h=self.canvas_h, bg=self.background, tool=self.current_tool.get(),
+                              width=self.stroke_width.get(), stroke=self.stroke_color, fill=self.fill_color)
+            self.status("Макрос жазылуда...")
+            return
+        self._macro.stop()
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("Macro JSON", "*.json")])
+        if not path:
+            return
+        try:
+            self._macro.save(path)
+            self.status(f"Макрос сақталды: {len(self._macro.events)} оқиға")
+        except Exception as e:
+            messagebox.showerror("Макрос", f"Сақтау мүмкін болмады:\n{e}")
+
+    def set_render_mode(self):
+        if not PIL_AVAILABLE and self.render_mode.get() == "backbuffer":
+            self.render_mode.set("items")
+            messagebox.showerror("Қате", "Pillow қажет: pip install pillow")
+            return
+        self._reset_bake()
+        self.redraw_all()
+        self.status(f"Сызу режимі: {self.render_mode.get()}")
 
     # ---------- Undo/Redo (твоя старая логика остаётся) ----------
+    @traced()
     def undo(self):
         if not self.shapes: return
-        self._undo_stack.append(self.shapes.pop())
+        self._forget_baked(len(self.shapes) - 1)
+        self.doc.undo()
         self.redraw_all()
         self.mark_dirty(True)
         self.status("Артқа")
 
+    @traced()
     def redo(self):
-        if not self._undo_stack: return
-        self.shapes.append(self._undo_stack.pop())
+        if self.doc.redo() is None: return
         self.redraw_all()
         self.mark_dirty(True)
         self.status("Алға")
@@ -712,52 +1218,83 @@ class Editor(ttk.Frame):
         )
 
     # ---------- Экспорт ----------
+    @traced()
     def export_as(self):
         if not PIL_AVAILABLE:
             messagebox.showerror("Экспорт", "Pillow (PIL) табылмады. Экспорт үшін орнатыңыз: pip install pillow")
             return
         path = filedialog.asksaveasfilename(
             defaultextension=".png",
-            filetypes=[("PNG Image","*.png"), ("JPEG Image","*.jpg;*.jpeg"), ("BMP Image","*.bmp")]
+            filetypes=[("PNG Image","*.png"), ("JPEG Image","*.jpg;*.jpeg"), ("BMP Image","*.bmp"),
+                       ("SVG","*.svg"), ("PDF","*.pdf")]
         )
         if not path:
             return
 
-        W, H = self.canvas_w, self.canvas_h
-        img = Image.new("RGB", (W, H), ImageColor.getrgb(self.background))
-        if self.raster_img is not None:
-            img.paste(self.raster_img.convert("RGB"), (0, 0))
-        draw = ImageDraw.Draw(img)
-
-        for s in self.shapes:
-            t = s["type"]; coords = s["coords"]; stroke = s.get("stroke","#000"); width = s.get("width",2)
-            if t == "pen":
-                pts = [(coords[i], coords[i+1]) for i in range(0, len(coords), 2)]
-                if len(pts) >= 2:
-                    draw.line(pts, fill=stroke, width=width, joint="curve")
-            elif t == "line":
-                x0,y0,x1,y1 = map(int, coords)
-                draw.line([(x0,y0),(x1,y1)], fill=stroke, width=width)
-            elif t == "rect":
-                x0,y0,x1,y1 = map(int, coords)
-                fill = s.get("fill", None) or None
-                draw.rectangle([x0,y0,x1,y1], outline=stroke, width=width, fill=fill)
-            elif t == "oval":
-                x0,y0,x1,y1 = map(int, coords)
-                fill = s.get("fill", None) or None
-                draw.ellipse([x0,y0,x1,y1], outline=stroke, width=width, fill=fill)
+        # тот же композитинг, что и у тайлов backbuffer; общий с CLI. Рендер — в пуле процессов
+        t0 = time.perf_counter()
 
-        try:
-            img.save(path)
-            self.status("Экспорт завершён")
-        except Exception as e:
-            messagebox.showerror("Экспорт", f"Сақтау мүмкін болмады:\n{e}")
+        def done(hit):
+            self._telemetry("export", t0, bytes=os.path.getsize(path), cached=hit)
+            self.status("Экспорт завершён (из кэша)" if hit else "Экспорт завершён")
+
+        self.app.pool.export(self.doc, path, aa=self.export_aa.get(), on_done=done,
+                             on_error=lambda e: messagebox.showerror("Экспорт", f"Сақтау мүмкін болмады:\n{e}"))
+        self.status("Экспорт…")
 
     def toggle_debug(self):
         self.debug = not self.debug
         self.status(f"DEBUG: {'ON' if self.debug else 'OFF'}")
         if not self.debug:
             self._clear_dbg()
+        self._toggle_hud(self.debug)
+
+    # ---------- HUD производительности (F12) ----------
+    def _toggle_hud(self, on):
+        if on:
+            if self._hud is None:
+                self._hud = tk.Label(self.canvas, justify=tk.LEFT, anchor="nw", bg="#111111", fg="#7CFC00",
+                                     font=("Consolas", 9), padx=6, pady=4)
+            self._hud.place(x=8, y=8)
+            self._hud_tick()
+        else:
+            if self._hud_job is not None:
+                self.after_cancel(self._hud_job)
+                self._hud_job = None
+            if self._hud is not None:
+                self._hud.place_forget()
+
+    def _hud_tick(self):
+        """Обновляет HUD 4 раза в секунду, пока включён debug; счётчики только читаются."""
+        self._hud_job = None
+        if not self.debug:
+            return
+        self._hud.config(text="\n".join(self._hud_lines()))
+        self._hud_job = self.after(250, self._hud_tick)
+
+    def _hud_lines(self):
+        lat = list(self._latency_ms)
+        if lat:
+            p95 = sorted(lat)[min(len(lat) - 1, int(len(lat) * 0.95))]
+            lat_s = f"{lat[-1]:.1f} ms (avg {sum(lat) / len(lat):.1f}, p95 {p95:.1f})"
+        else:
+            lat_s = "—"
+        key = (self.doc.revision, self.raster_img is not None)
+        if self._mem_memo[0] != key:
+            self._mem_memo = (key, self.doc.memory_estimate())
+        fill = self._fill_ms
+        fill_s = " / ".join(f"{k} {fill[k]:.1f}" for k in ("scene", "mask", "composite", "upload") if k in fill)
+        return [
+            f"frame        {self._frame_ms:.1f} ms ({'fast' if self._auto_cheap else 'full'} preview)",
+            f"input→paint  {lat_s}",
+            f"redraw       {self._redraw_ms:.1f} ms",
+            f"canvas items {len(self.canvas.find_all())}",
+            f"history      {self._mem_memo[1] / 1e6:.2f} MB ({len(self.shapes)} shapes, redo {self.doc.redo_count})",
+            f"tiles        {len(self._bake_tiles)} ({len(self._baked)} shapes baked)",
+            f"last fill    {fill_s + ' ms' if fill_s else '—'}",
+            f"idle queue   {len(self.idle)} (max slice {self.idle.stats['max_slice_ms']:.1f} ms)",
+            f"workers      {self.app.pool.busy} busy",
+        ]
 
     def _dbg(self, *args):
         if self.debug:
@@ -777,7 +1314,6 @@ class Editor(ttk.Frame):
             except:
                 pass
             self._dbg_mask_item = None
-            self._dbg_mask_tk = None
 
     def _dbg_point(self, x, y, color="#0078ff", r=3, text=None):
         if not self.debug: return
@@ -790,29 +1326,59 @@ class Editor(ttk.Frame):
     def _dbg_mask(self, mask, tint=(0, 255, 0, 90)):
         """Показать маску полупрозрачно поверх (над растровым слоем, под вектором)."""
         if not self.debug or mask is None: return
-        from PIL import Image
-        W, H = mask.size
-        overlay = Image.new("RGBA", (W, H), (0, 0, 0, 0))
-        # окрасить 1-пиксели маски
-        tint_img = Image.new("RGBA", (W, H), tint)
-        overlay.paste(tint_img, (0, 0), mask)
-        self._dbg_mask_tk = ImageTk.PhotoImage(overlay)
+        from PIL import Image, ImageTk
+        box = mask.getbbox()
+        if self._dbg_mask_img is None or self._dbg_mask_img.size != mask.size:
+            self._dbg_mask_img = Image.new("RGBA", mask.size, (0, 0, 0, 0))
+            self._dbg_mask_tk = None
+            self._dbg_mask_box = None
+        overlay = self._dbg_mask_img
+        # стереть прошлую маску и окрасить 1-пиксели новой — только в их габаритах
+        dirty = self._dbg_mask_box
+        if dirty:
+            overlay.paste((0, 0, 0, 0), dirty)
+        if box:
+            overlay.paste(tint, box, mask.crop(box))
+            dirty = box if dirty is None else (min(dirty[0], box[0]), min(dirty[1], box[1]),
+                                               max(dirty[2], box[2]), max(dirty[3], box[3]))
+        self._dbg_mask_box = box
+        if self._dbg_mask_tk is None:
+            self._dbg_mask_tk = ImageTk.PhotoImage(overlay)
+        elif dirty:
+            photo_paste(self._dbg_mask_tk, overlay, dirty)
         if self._dbg_mask_item and self.canvas.type(self._dbg_mask_item) == "image":
             self.canvas.itemconfig(self._dbg_mask_item, image=self._dbg_mask_tk)
         else:
             self._dbg_mask_item = self.canvas.create_image(0, 0, image=self._dbg_mask_tk, anchor="nw",
                                                            tags=("__dbgmask__",))
         # порядок: фон -> растровая заливка -> DBG маска -> вектор
-        self.canvas.tag_lower(self._dbg_mask_item)
-        if self.raster_item:  # поднять маску над растровым слоем
-            self.canvas.tag_raise(self._dbg_mask_item, self.raster_item)
+        self._restack_layers()
+
+def report_startup(app, t_imports, t_app):
+    """--profile-startup: время этапов запуска в мс одной строкой, затем выход."""
+    app.update()  # первый кадр главного меню отрисован
+    t_frame = time.perf_counter()
+    pil_at_start = "PIL" in sys.modules
+    app.get_frame("Editor")  # отложенная часть — меряем отдельно
+    print(f"startup: imports {(t_imports - _T_START) * 1000:.1f} ms, "
+          f"App() {(t_app - t_imports) * 1000:.1f} ms, "
+          f"first frame {(t_frame - _T_START) * 1000:.1f} ms total, "
+          f"MainMenu {app.build_ms['MainMenu']:.1f} ms, "
+          f"Editor (deferred) {app.build_ms['Editor']:.1f} ms, "
+          f"PIL at start: {'yes' if pil_at_start else 'no'}")
+    app.destroy()
+
 
 if __name__ == "__main__":
+    t_imports = time.perf_counter()
     app = App()
+    t_app = time.perf_counter()
     try:
         from ctypes import windll
         app.call('tk', 'scaling', 1.2)
         windll.shcore.SetProcessDpiAwareness(1)
     except Exception:
         pass
+    if "--profile-startup" in sys.argv[1:]:
+        app.after_idle(report_startup, app, t_imports, t_app)
     app.mainloop()
\ No newline at end of file
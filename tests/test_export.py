@@ -0,0 +1,80 @@
+"""Экспорт полосами и тайлами должен совпадать с целым рендером документа попиксельно."""
+import os
+
+import pytest
+from PIL import Image, ImageChops
+
+from graphic_redactor.bench import synthetic_document
+from graphic_redactor.document import Document
+from graphic_redactor.export import PARALLEL_PIXELS, band_boxes, export_document, export_tiles, write_png_stream
+
+
+def _same(a, b):
+    assert a.size == b.size
+    return ImageChops.difference(a.convert("RGB"), b.convert("RGB")).getbbox() is None
+
+
+@pytest.fixture(scope="module")
+def doc():
+    return synthetic_document(300, seed=3, fills=2, size=(640, 400))
+
+
+@pytest.mark.parametrize("band", [37, 64, 128])
+@pytest.mark.parametrize("aa, aa_filter", [(1, "lanczos"), (2, "lanczos"), (3, "box")])
+def test_band_export_matches_full_render(doc, tmp_path, band, aa, aa_filter):
+    path = str(tmp_path / "band.png")
+    export_document(doc, path, band=band, jobs=1, aa=aa, aa_filter=aa_filter)
+    assert _same(Image.open(path), doc.render(scale=aa, resample=aa_filter))
+
+
+@pytest.mark.parametrize("shape", [
+    {"type": "line", "coords": [10, 50, 90, 50], "stroke": "#000000", "width": 5, "fill": ""},
+    {"type": "rect", "coords": [20, 20, 80, 80], "stroke": "#000000", "width": 1, "fill": "#000000"},
+])
+def test_supersampling_keeps_pixel_centres(shape):
+    # центр пикселя холста — центр блока scale×scale: сглаженная фигура не съезжает влево-вверх
+    def centroid(scale):
+        d = Document(100, 100, "#ffffff")
+        d.shapes = [shape]
+        img = d.render(scale=scale, resample="box").convert("L")
+        ink = [(x, y, 255 - img.getpixel((x, y))) for y in range(100) for x in range(100)]
+        total = sum(v for _, _, v in ink)
+        return sum(x * v for x, _, v in ink) / total, sum(y * v for _, y, v in ink) / total
+
+    assert centroid(3) == pytest.approx(centroid(1), abs=0.01)
+
+
+def test_tiles_match_full_render(doc, tmp_path):
+    full = doc.render()
+    paths = export_tiles(doc, str(tmp_path), tile=100)
+    for p in paths:
+        x, y = map(int, os.path.splitext(os.path.basename(p))[0].split("_")[1:])
+        tile = Image.open(p)
+        assert _same(tile, full.crop((x, y, x + tile.width, y + tile.height))), p
+
+
+@pytest.mark.parametrize("band", [None, 256])
+def test_parallel_bands_match_full_render(tmp_path, band):
+    big = synthetic_document(2000, seed=5, fills=1, size=(4000, 2100))
+    assert big.canvas_w * big.canvas_h > PARALLEL_PIXELS
+    path = str(tmp_path / "parallel.png")
+    export_document(big, path, band=band, jobs=2)
+    assert _same(Image.open(path), big.render())
+
+
+@pytest.mark.parametrize("band", [1, 7, 64, 400])
+def test_png_stream_decodes_like_pil(doc, tmp_path, band):
+    img = doc.render()
+    W, H = img.size
+    streamed, saved = str(tmp_path / "stream.png"), str(tmp_path / "pil.png")
+    write_png_stream(streamed, W, H, (img.crop(box) for box in band_boxes(W, H, band)))
+    img.save(saved, "PNG")
+    a, b = Image.open(streamed), Image.open(saved)
+    assert (a.mode, a.size) == (b.mode, b.size) == ("RGB", (W, H))
+    assert a.tobytes() == b.tobytes()
+
+
+def test_png_stream_rejects_wrong_height(doc, tmp_path):
+    img = doc.render()
+    with pytest.raises(ValueError):
+        write_png_stream(str(tmp_path / "short.png"), img.width, img.height + 1, [img])
@@ -0,0 +1,93 @@
+"""Упрощение штрихов пера (RDP), подгонка и разворачивание кривых Безье."""
+import math
+import random
+
+import pytest
+
+from graphic_redactor.geometry import _bez_at, fit_bezier, flatten_bezier, simplify_points
+
+
+def _walk(n, seed, step=6.0):
+    rnd = random.Random(seed)
+    x, y, out = 100.0, 100.0, []
+    for _ in range(n):
+        out += [round(x, 1), round(y, 1)]
+        x += rnd.uniform(-step, step)
+        y += rnd.uniform(-step, step)
+    return out
+
+
+def _pairs(coords):
+    return [(coords[i], coords[i + 1]) for i in range(0, len(coords) - 1, 2)]
+
+
+def _seg_dist(p, a, b):
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    L2 = dx * dx + dy * dy
+    t = 0 if L2 == 0 else max(0, min(1, ((p[0] - a[0]) * dx + (p[1] - a[1]) * dy) / L2))
+    return math.hypot(p[0] - a[0] - t * dx, p[1] - a[1] - t * dy)
+
+
+def _poly_dist(p, poly):
+    return min(_seg_dist(p, poly[i], poly[i + 1]) for i in range(len(poly) - 1))
+
+
+@pytest.mark.parametrize("tol", [0.5, 1.5, 4.0])
+@pytest.mark.parametrize("seed", range(5))
+def test_simplify_within_tolerance(seed, tol):
+    raw = _walk(200, seed)
+    out = simplify_points(raw, tol)
+    pts, kept = _pairs(raw), _pairs(out)
+    assert kept[0] == pts[0] and kept[-1] == pts[-1]
+    assert len(kept) < len(pts)
+    # каждая выброшенная точка — не дальше tol от отрезка между соседними оставленными
+    j = 0
+    for p in pts:
+        if j + 1 < len(kept) and p == kept[j + 1]:
+            j += 1
+            continue
+        if p != kept[j]:
+            assert _seg_dist(p, kept[j], kept[j + 1]) <= tol + 1e-9
+
+
+def test_simplify_edge_cases():
+    assert simplify_points([0, 0, 5, 5, 10, 10], 0) == [0, 0, 5, 5, 10, 10]
+    assert simplify_points([0, 0, 10, 10], 3) == [0, 0, 10, 10]
+    assert simplify_points([0, 0, 5, 5, 10, 10, 15, 15], 0.1) == [0, 0, 15, 15]
+
+
+@pytest.mark.parametrize("error", [1.0, 2.0])
+@pytest.mark.parametrize("seed", range(5))
+def test_fit_bezier_stays_within_error(seed, error):
+    raw = _walk(120, seed)
+    bez = fit_bezier(raw, error)
+    assert (len(bez) - 2) % 6 == 0
+    assert bez[:2] == [round(v, 2) for v in raw[:2]] and bez[-2:] == [round(v, 2) for v in raw[-2:]]
+    curve = flatten_bezier(bez, 0.01)
+    # запас на округление опорных точек до сотых
+    for p in _pairs(raw):
+        assert _poly_dist(p, curve) <= error + 0.05
+
+
+def test_fit_bezier_degenerate():
+    assert fit_bezier([5, 5], 1) is None
+    assert fit_bezier([5, 5, 5, 5], 1) is None
+    assert len(fit_bezier([0, 0, 10, 0], 1)) == 8
+
+
+def test_flatten_bezier_endpoints_and_tolerance():
+    bez = [0, 0, 30, 80, 70, -40, 100, 20, 130, 80, 160, 0, 200, 40]
+    tol = 0.25
+    out = flatten_bezier(bez, tol)
+    assert out[0] == (0, 0)
+    assert out[-1] == pytest.approx((200, 40))
+    # опорная точка на стыке сегментов тоже лежит на ломаной
+    assert any(p == pytest.approx((100, 20)) for p in out)
+    for k in (0, 6):
+        b = _pairs(bez[k:k + 8])
+        for i in range(101):
+            assert _poly_dist(_bez_at(b, i / 100), out) <= tol + 1e-9
+
+
+def test_flatten_bezier_short_input():
+    assert flatten_bezier([1, 2, 3, 4]) == [(1, 2), (3, 4)]
@@ -0,0 +1,91 @@
+"""Структура PDF (xref, длины потоков) и корректность SVG из векторного экспорта."""
+import re
+import xml.etree.ElementTree as ET
+import zlib
+
+import pytest
+
+from graphic_redactor.bench import synthetic_document
+from graphic_redactor.vector import write_pdf, write_svg
+
+
+@pytest.fixture(scope="module")
+def doc():
+    d = synthetic_document(60, seed=2, fills=2, size=(500, 300))
+    d.shapes.append({"type": "bezier", "coords": [10, 10, 40, 80, 90, -20, 120, 40],
+                     "stroke": "#2962ff", "width": 3, "fill": ""})
+    return d
+
+
+def _xref(data):
+    """{номер: смещение} из таблицы xref и номер корня из trailer."""
+    start = int(re.search(rb"startxref\s+(\d+)\s+%%EOF\s*$", data).group(1))
+    assert data[start:start + 4] == b"xref"
+    lines = data[start:].split(b"\n")
+    first, count = map(int, lines[1].split())
+    assert first == 0
+    entries = lines[2:2 + count]
+    assert entries[0].startswith(b"0000000000 65535 f")
+    offsets = {}
+    for n, e in enumerate(entries[1:], 1):
+        off, gen, kind = e.split()[:3]
+        assert kind == b"n" and gen == b"00000"
+        offsets[n] = int(off)
+    trailer = b"\n".join(lines[2 + count:])
+    assert int(re.search(rb"/Size (\d+)", trailer).group(1)) == count
+    return offsets, int(re.search(rb"/Root (\d+) 0 R", trailer).group(1))
+
+
+def _obj(data, offsets, n):
+    off = offsets[n]
+    head = b"%d 0 obj\n" % n
+    assert data[off:off + len(head)] == head, f"xref объекта {n} указывает не на него"
+    return data[off + len(head):data.index(b"endobj", off)]
+
+
+def test_pdf_xref_offsets(doc, tmp_path):
+    path = str(tmp_path / "doc.pdf")
+    write_pdf(doc, path)
+    data = open(path, "rb").read()
+    assert data.startswith(b"%PDF-1.4\n")
+    offsets, root = _xref(data)
+    bodies = {n: _obj(data, offsets, n) for n in offsets}
+    assert b"/Type /Catalog" in bodies[root]
+    images = [n for n, b in bodies.items() if b"/Subtype /Image" in b]
+    assert images, "тайлы заливки должны попасть в PDF"
+    # длины потоков (прямые и через отдельный объект) совпадают с данными, и данные распаковываются
+    for n, body in bodies.items():
+        if b"stream\n" not in body:
+            continue
+        m = re.search(rb"/Length (\d+)( 0 R)?", body)
+        length = int(bodies[int(m.group(1))]) if m.group(2) else int(m.group(1))
+        start = body.index(b"stream\n") + len(b"stream\n")
+        assert body[start + length:].startswith(b"\nendstream")
+        zlib.decompress(body[start:start + length])
+
+
+def test_pdf_content_has_every_shape(doc, tmp_path):
+    path = str(tmp_path / "doc.pdf")
+    write_pdf(doc, path)
+    data = open(path, "rb").read()
+    offsets, _ = _xref(data)
+    page = next(_obj(data, offsets, n) for n in offsets if b"/Type /Page " in _obj(data, offsets, n))
+    content = int(re.search(rb"/Contents (\d+) 0 R", page).group(1))
+    body = _obj(data, offsets, content)
+    m = re.search(rb"/Length (\d+) 0 R", body)
+    length = int(_obj(data, offsets, int(m.group(1))))
+    start = body.index(b"stream\n") + len(b"stream\n")
+    ops = zlib.decompress(body[start:start + length]).decode()
+    # каждая фигура — одна строка, заканчивающаяся оператором обводки / заливки
+    assert sum(1 for line in ops.splitlines() if re.search(r" [SB]$", line)) == len(doc.shapes)
+
+
+def test_svg_is_well_formed(doc, tmp_path):
+    path = str(tmp_path / "doc.svg")
+    write_svg(doc, path)
+    root = ET.parse(path).getroot()
+    ns = "{http://www.w3.org/2000/svg}"
+    assert root.tag == ns + "svg"
+    assert root.get("width") == "500" and root.get("height") == "300"
+    drawn = [el for el in root if el.tag != ns + "image"]
+    assert len(drawn) == len(doc.shapes) + 1  # + фон